@@ -0,0 +1,96 @@
+"""Single-core HTML to Markdown conversion benchmark.
+
+Compares the original pipeline (a full html.parser parse for the title plus a
+second html.parser parse for conversion) against the single-parse pipeline
+with each available parser backend.
+
+    python -m benchmarks.bench_convert --pages 200 --size 40
+"""
+import argparse
+import random
+import time
+from typing import Callable, List
+
+from bs4 import BeautifulSoup
+
+from converters.html_to_md import DEFAULT_CONTENT_SELECTORS, HTMLToMarkdownConverter, STRIPPED_TAGS
+from markdownify import MarkdownConverter
+
+def synthetic_page(index: int, size_kb: int) -> str:
+    """Build a documentation-like page of roughly size_kb kilobytes."""
+    rng = random.Random(index)
+    sections = []
+    while sum(len(section) for section in sections) < size_kb * 1024:
+        words = ' '.join(rng.choice(['cloud', 'storage', 'bucket', 'object', 'api', 'request', 'quota']) for _ in range(40))
+        sections.append(
+            f'<h2 id="s{len(sections)}">Section {len(sections)}</h2>'
+            f'<p>{words} <a href="/docs/page-{rng.randint(0, 999)}">link</a> <code>gsutil ls</code></p>'
+            f'<ul><li>{words[:60]}</li><li>{words[60:120]}</li></ul>'
+            f'<pre><code>curl https://example.com/v1/items/{index}</code></pre>'
+        )
+    nav = ''.join(f'<li><a href="/docs/nav-{i}">Nav {i}</a></li>' for i in range(100))
+    sidebar = ''.join(f'<li><a href="/docs/guide-{i}">Guide {i}: {rng.choice(["Buckets", "Objects", "IAM"])}</a></li>' for i in range(300))
+    toc = ''.join(f'<li><a href="#s{i}">Section {i}</a></li>' for i in range(len(sections)))
+    return (
+        f'<html><head><title>Page {index} | Google Cloud</title><style>body{{}}</style>'
+        f'<script>var x = {index};</script></head><body><header>Header</header>'
+        f'<nav><ul>{nav}</ul></nav><div class="devsite-book-nav"><ul>{sidebar}</ul></div>'
+        f'<main><article><h1>Page {index}</h1>{"".join(sections)}</article>'
+        f'<aside class="devsite-toc"><ul>{toc}</ul></aside></main>'
+        f'<footer>Footer</footer></body></html>'
+    )
+
+def legacy_pipeline(html: str, url: str) -> None:
+    """The original title fetch parse plus conversion parse, both html.parser."""
+    soup = BeautifulSoup(html, 'html.parser')
+    HTMLToMarkdownConverter.clean_title(soup.title.string if soup.title else url, url)
+    soup = BeautifulSoup(html, 'html.parser')
+    for element in soup.find_all(STRIPPED_TAGS):
+        element.decompose()
+    MarkdownConverter().convert_soup(soup)
+
+def single_parse_pipeline(parser: str, content_selectors=None) -> Callable[[str, str], None]:
+    def run(html: str, url: str) -> None:
+        HTMLToMarkdownConverter.extract_title(html, url, parser)
+        HTMLToMarkdownConverter.convert(html, parser, content_selectors)
+    return run
+
+def measure(name: str, pipeline: Callable[[str, str], None], pages: List[str]) -> float:
+    started = time.perf_counter()
+    for index, html in enumerate(pages):
+        pipeline(html, f'https://example.com/docs/page-{index}')
+    elapsed = time.perf_counter() - started
+    rate = len(pages) / elapsed
+    print(f"{name:<28} {rate:8.1f} pages/s/core  ({elapsed:.2f}s)")
+    return rate
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=200)
+    parser.add_argument('--size', type=int, default=40, help='approximate page size in KB')
+    args = parser.parse_args()
+
+    pages = [synthetic_page(i, args.size) for i in range(args.pages)]
+    print(f"{args.pages} pages of ~{args.size} KB")
+
+    baseline = measure('legacy (2x html.parser)', legacy_pipeline, pages)
+    backends = ['html.parser']
+    try:
+        import lxml  # noqa: F401
+        backends.append('lxml')
+    except ImportError:
+        print("lxml not installed; skipping lxml backend")
+
+    for backend in backends:
+        rate = measure(f'single parse ({backend})', single_parse_pipeline(backend), pages)
+        print(f"{'':<28} {rate / baseline:8.2f}x legacy")
+
+    backend = backends[-1]
+    rate = measure(f'main content ({backend})', single_parse_pipeline(backend, DEFAULT_CONTENT_SELECTORS), pages)
+    print(f"{'':<28} {rate / baseline:8.2f}x legacy")
+    full = sum(len(HTMLToMarkdownConverter.convert(html, backend)) for html in pages[:20])
+    extracted = sum(len(HTMLToMarkdownConverter.convert(html, backend, DEFAULT_CONTENT_SELECTORS)) for html in pages[:20])
+    print(f"main content output size: {extracted / full:.0%} of full page markdown")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+"""End-to-end crawl benchmark against a local synthetic documentation site.
+
+Starts benchmarks.mock_site in a separate process (so its CPU and memory are
+not counted) and measures the crawler's sitemap, fetch and conversion phases
+separately: pages/s, bytes/s, CPU time and peak RSS for each.
+
+    python -m benchmarks.bench_crawl --pages 2000 --latency 20 --throttle-rate 0.02
+    python -m benchmarks.bench_crawl --save before.json
+    python -m benchmarks.bench_crawl --compare before.json
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Tuple
+from urllib.request import urlopen
+
+from benchmarks.mock_site import MockDocServer, SiteOptions, add_site_arguments, site_options
+from converters.html_to_md import HTMLToMarkdownConverter
+from crawler.async_crawler import AsyncDocCrawler
+from crawler.crawler import DocCrawler
+from utils.config import CrawlerConfig
+
+@dataclass
+class PhaseResult:
+    name: str
+    seconds: float
+    pages: int
+    bytes: int
+    cpu_seconds: float
+    peak_rss: int
+    errors: int = 0
+
+    @property
+    def pages_per_second(self) -> float:
+        return self.pages / self.seconds if self.seconds else 0.0
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.bytes / self.seconds if self.seconds else 0.0
+
+def serve(options: SiteOptions, ready) -> None:
+    """Mock site process entry point; sends the base URL back once listening."""
+    server = MockDocServer(options)
+    ready.send(server.base_url)
+    server.serve_forever()
+
+def server_stats(base_url: str) -> dict:
+    with urlopen(f'{base_url}/_stats') as response:
+        return json.load(response)
+
+def read_rss() -> Optional[int]:
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+@contextmanager
+def peak_rss_sampler(interval: float = 0.01) -> Iterator[dict]:
+    """Track this process's peak resident set size while the block runs.
+
+    Samples /proc/self/statm; elsewhere falls back to the lifetime peak from
+    getrusage, which cannot be split per phase.
+    """
+    result = {'peak': read_rss() or 0}
+    stop = threading.Event()
+
+    def sample() -> None:
+        while not stop.wait(interval):
+            result['peak'] = max(result['peak'], read_rss() or 0)
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    try:
+        yield result
+    finally:
+        stop.set()
+        sampler.join()
+        if not result['peak']:
+            import resource
+            result['peak'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def measure(name: str, run: Callable[[], Tuple[int, int, int]]) -> PhaseResult:
+    """Time one phase; run returns (pages, bytes, errors)."""
+    with peak_rss_sampler() as rss:
+        cpu = time.process_time()
+        started = time.perf_counter()
+        pages, size, errors = run()
+        elapsed = time.perf_counter() - started
+        cpu = time.process_time() - cpu
+    return PhaseResult(name, elapsed, pages, size, cpu, rss['peak'], errors)
+
+def run_phases(args: argparse.Namespace, base_url: str, workdir: Path) -> List[PhaseResult]:
+    config = CrawlerConfig(
+        base_url=f'{base_url}/docs/overview',
+        max_workers=args.workers,
+        quiet=True,
+        retry_delay=args.retry_delay,
+        lazy_titles=True,
+        state_file=str(workdir / 'state.db'),
+        output_dir=str(workdir / 'out'),
+        body_cache_dir=str(workdir / 'bodies'),
+        metrics_file=''
+    )
+    crawler_class = AsyncDocCrawler if args.async_engine else DocCrawler
+    crawler = crawler_class(config, [config.base_url])
+
+    def sitemap_phase() -> Tuple[int, int, int]:
+        before = server_stats(base_url)['bytes']
+        crawler.parse_sitemap(crawler.base_urls)
+        return len(crawler.sitemap), server_stats(base_url)['bytes'] - before, crawler.display.stats['errors']
+
+    def fetch_phase() -> Tuple[int, int, int]:
+        # Raw HTML only, so this is the network path plus plain file writes
+        before = server_stats(base_url)['bytes']
+        crawler.process_selected_pages(list(crawler.sitemap), True, False, False, False)
+        stats = crawler.display.stats
+        return stats['processed'], server_stats(base_url)['bytes'] - before, stats['errors']
+
+    pages = []
+
+    def convert_phase() -> Tuple[int, int, int]:
+        size = 0
+        for html in pages:
+            HTMLToMarkdownConverter.convert_page(html, base_url, config.html_parser)
+            size += len(html)
+        return len(pages), size, 0
+
+    results = [measure('sitemap', sitemap_phase), measure('fetch', fetch_phase)]
+    pages.extend(path.read_text(encoding='utf-8') for path in (workdir / 'out').rglob('*.html'))
+    results.append(measure('convert', convert_phase))
+    return results
+
+def report(results: List[PhaseResult], baseline: Optional[dict] = None) -> None:
+    print(f"{'phase':<8} {'pages':>7} {'seconds':>8} {'pages/s':>9} {'MB/s':>8} {'CPU s':>7} {'CPU %':>6} {'peak RSS':>9} {'errors':>6}")
+    for result in results:
+        print(
+            f"{result.name:<8} {result.pages:>7,} {result.seconds:>8.2f} {result.pages_per_second:>9.1f} "
+            f"{result.bytes_per_second / 1048576:>8.2f} {result.cpu_seconds:>7.2f} "
+            f"{result.cpu_seconds / result.seconds * 100 if result.seconds else 0:>5.0f}% "
+            f"{result.peak_rss / 1048576:>7.1f}MB {result.errors:>6,}"
+        )
+        previous = (baseline or {}).get(result.name)
+        if previous and previous['pages'] and previous['seconds']:
+            ratio = result.pages_per_second / (previous['pages'] / previous['seconds'])
+            print(f"{'':<8} {ratio:>27.2f}x baseline pages/s")
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_site_arguments(parser)
+    parser.add_argument('--workers', type=int, default=10, help='crawler max_workers')
+    parser.add_argument('--async', dest='async_engine', action='store_true', help='benchmark the asyncio engine')
+    parser.add_argument('--retry-delay', type=float, default=0.1, help='base retry backoff in seconds')
+    parser.add_argument('--save', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='JSON results of an earlier run to compare against')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger('crawler').setLevel(logging.CRITICAL)
+
+    options = site_options(args)
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    server = multiprocessing.Process(target=serve, args=(options, sender), daemon=True)
+    server.start()
+    try:
+        base_url = receiver.recv()
+        print(
+            f"{options.pages} pages of ~{options.page_size} KB, latency {options.latency:g} ms, "
+            f"429 rate {options.throttle_rate:g}, error rate {options.error_rate:g}, "
+            f"{'async' if args.async_engine else 'threaded'} engine"
+        )
+        with tempfile.TemporaryDirectory(prefix='bench_crawl_') as workdir:
+            cwd = os.getcwd()
+            # selected_urls/ and other relative paths stay inside the scratch directory
+            os.chdir(workdir)
+            try:
+                results = run_phases(args, base_url, Path(workdir))
+            finally:
+                os.chdir(cwd)
+        served = server_stats(base_url)
+    finally:
+        server.terminate()
+        server.join()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)['phases']
+    report(results, baseline)
+    print(f"server: {served['requests']:,} requests, {served['throttled']:,} throttled, {served['errors']:,} errors")
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump({
+                'options': asdict(options),
+                'engine': 'async' if args.async_engine else 'threaded',
+                'workers': args.workers,
+                'phases': {result.name: asdict(result) for result in results}
+            }, f, indent=2)
+
+if __name__ == '__main__':
+    main()
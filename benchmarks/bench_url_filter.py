@@ -0,0 +1,77 @@
+"""Sitemap URL relevance filter benchmark.
+
+Compares the original per-URL check (urlparse, a startswith loop over the base
+paths and a full parse_qs) against URLProcessor.is_relevant_url and the
+filter_relevant batch API on a synthetic sitemap.
+
+    python -m benchmarks.bench_url_filter --urls 500000
+"""
+import argparse
+import random
+import time
+from typing import Callable, List
+from urllib.parse import parse_qs, urlparse
+
+from utils.url_processor import URLProcessor
+
+DOMAIN = 'cloud.google.com'
+BASE_PATHS = ['/storage/docs', '/bigquery/docs', '/run/docs']
+PRODUCTS = ['storage', 'bigquery', 'run', 'compute', 'functions', 'pubsub', 'sql', 'kubernetes-engine']
+LANGUAGES = ['fr', 'de', 'es', 'ja', 'ko', 'zh-cn', 'pt-br']
+
+def synthetic_sitemap(count: int) -> List[str]:
+    """Build count documentation URLs, some localised and some off-domain."""
+    rng = random.Random(0)
+    urls = []
+    for index in range(count):
+        host = DOMAIN if rng.random() < 0.95 else 'developers.google.com'
+        url = f'https://{host}/{rng.choice(PRODUCTS)}/docs/section-{index % 97}/page-{index}'
+        roll = rng.random()
+        if roll < 0.5:
+            url += f'?hl={rng.choice(LANGUAGES)}'
+        elif roll < 0.55:
+            url += '?authuser=1&hl=en'
+        urls.append(url)
+    return urls
+
+def legacy_is_relevant(url: str, language: str) -> bool:
+    """The original URLProcessor.is_relevant_url."""
+    parsed_url = urlparse(url)
+    if parsed_url.netloc != DOMAIN:
+        return False
+    if not any(parsed_url.path.startswith(base_path) for base_path in BASE_PATHS):
+        return False
+    url_language = parse_qs(parsed_url.query).get('hl', [None])[0]
+    if language == 'en':
+        return url_language is None
+    return url_language == language
+
+def measure(name: str, run: Callable[[], List[str]], count: int) -> float:
+    started = time.perf_counter()
+    relevant = run()
+    elapsed = time.perf_counter() - started
+    rate = count / elapsed
+    print(f"{name:<24} {rate / 1e6:8.2f} M URLs/s  ({elapsed:.2f}s, {len(relevant):,} relevant)")
+    return rate
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--urls', type=int, default=500000)
+    parser.add_argument('--language', default='en')
+    args = parser.parse_args()
+
+    urls = synthetic_sitemap(args.urls)
+    processor = URLProcessor(DOMAIN, BASE_PATHS, headers={}, timeout=10)
+    expected = [url for url in urls if legacy_is_relevant(url, args.language)]
+    if processor.filter_relevant(urls, args.language) != expected:
+        raise SystemExit("filter_relevant disagrees with the original implementation")
+
+    print(f"{args.urls:,} URLs, language {args.language}")
+    baseline = measure('legacy', lambda: [url for url in urls if legacy_is_relevant(url, args.language)], len(urls))
+    rate = measure('is_relevant_url', lambda: [url for url in urls if processor.is_relevant_url(url, args.language)], len(urls))
+    print(f"{'':<24} {rate / baseline:8.2f}x legacy")
+    rate = measure('filter_relevant (batch)', lambda: processor.filter_relevant(urls, args.language), len(urls))
+    print(f"{'':<24} {rate / baseline:8.2f}x legacy")
+
+if __name__ == '__main__':
+    main()
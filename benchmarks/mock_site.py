@@ -0,0 +1,242 @@
+"""Local synthetic documentation site for offline crawler benchmarks.
+
+Serves robots.txt, a tree of nested sitemap indexes and generated pages under
+/docs/, with optional injected latency, 429 responses and server errors.
+With --compress, responses are gzipped for clients that accept it.
+GET /_stats returns the request, wire byte and fault counters as JSON.
+
+    python -m benchmarks.mock_site --pages 5000 --latency 20 --throttle-rate 0.05
+"""
+import argparse
+import gzip
+import json
+import math
+import random
+import time
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock
+from typing import List, Optional, Tuple
+
+from benchmarks.bench_convert import synthetic_page
+
+XML_HEADER = '<?xml version="1.0" encoding="UTF-8"?>'
+SITEMAP_XMLNS = 'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"'
+
+@dataclass
+class SiteOptions:
+    pages: int = 1000
+    page_size: int = 40
+    pages_per_sitemap: int = 500
+    sitemaps_per_index: int = 10
+    latency: float = 0.0
+    throttle_rate: float = 0.0
+    error_rate: float = 0.0
+    compress: bool = False
+    seed: int = 0
+
+class MockDocSite:
+    """Layout and fault injection for the synthetic site, independent of HTTP."""
+
+    def __init__(self, options: SiteOptions):
+        self.options = options
+        # Sitemap tree: level 0 holds the page sitemaps, each level above
+        # groups sitemaps_per_index children, and the single top node is /sitemap.xml
+        self.levels = [max(math.ceil(options.pages / options.pages_per_sitemap), 1)]
+        while self.levels[-1] > 1:
+            self.levels.append(math.ceil(self.levels[-1] / options.sitemaps_per_index))
+        self.attempts = {}
+        self.lock = Lock()
+        self.stats = {'requests': 0, 'bytes': 0, 'throttled': 0, 'errors': 0}
+
+    def sitemap_path(self, level: int, index: int) -> str:
+        if level == len(self.levels) - 1:
+            return '/sitemap.xml'
+        if level == 0:
+            return f'/sitemaps/pages-{index}.xml'
+        return f'/sitemaps/index-{level}-{index}.xml'
+
+    def sitemap(self, base: str, level: int, index: int) -> bytes:
+        if level == 0:
+            first = index * self.options.pages_per_sitemap
+            last = min(first + self.options.pages_per_sitemap, self.options.pages)
+            urls = ''.join(
+                f'<url><loc>{base}/docs/page-{page}</loc><lastmod>2024-01-{page % 28 + 1:02d}</lastmod></url>'
+                for page in range(first, last)
+            )
+            return f'{XML_HEADER}<urlset {SITEMAP_XMLNS}>{urls}</urlset>'.encode('utf-8')
+        first = index * self.options.sitemaps_per_index
+        last = min(first + self.options.sitemaps_per_index, self.levels[level - 1])
+        sitemaps = ''.join(
+            f'<sitemap><loc>{base}{self.sitemap_path(level - 1, child)}</loc></sitemap>'
+            for child in range(first, last)
+        )
+        return f'{XML_HEADER}<sitemapindex {SITEMAP_XMLNS}>{sitemaps}</sitemapindex>'.encode('utf-8')
+
+    def parse_sitemap_path(self, path: str) -> Optional[Tuple[int, int]]:
+        if path == '/sitemap.xml':
+            return len(self.levels) - 1, 0
+        name = path[len('/sitemaps/'):-len('.xml')] if path.startswith('/sitemaps/') and path.endswith('.xml') else ''
+        parts = name.split('-')
+        try:
+            if parts[0] == 'pages' and len(parts) == 2:
+                level, index = 0, int(parts[1])
+            elif parts[0] == 'index' and len(parts) == 3:
+                level, index = int(parts[1]), int(parts[2])
+            else:
+                return None
+        except ValueError:
+            return None
+        if 0 <= level < len(self.levels) - 1 and 0 <= index < self.levels[level]:
+            return level, index
+        return None
+
+    def fault(self, path: str) -> Optional[int]:
+        """Return 429 or 500 for the first request of a fraction of pages.
+
+        Faults are seeded per path so runs are repeatable, and retries of the
+        same path succeed.
+        """
+        with self.lock:
+            attempt = self.attempts.get(path, 0)
+            self.attempts[path] = attempt + 1
+        if attempt:
+            return None
+        roll = random.Random(f'{self.options.seed}:{path}').random()
+        if roll < self.options.throttle_rate:
+            return 429
+        if roll < self.options.throttle_rate + self.options.error_rate:
+            return 500
+        return None
+
+    def delay(self) -> None:
+        if self.options.latency > 0:
+            time.sleep(random.uniform(0.5, 1.5) * self.options.latency / 1000)
+
+    def record(self, size: int, status: int) -> None:
+        with self.lock:
+            self.stats['requests'] += 1
+            self.stats['bytes'] += size
+            if status == 429:
+                self.stats['throttled'] += 1
+            elif status >= 500:
+                self.stats['errors'] += 1
+
+# Distinct page bodies rendered up front; other pages reuse one with their own title
+PAGE_TEMPLATES = 64
+
+@lru_cache(maxsize=PAGE_TEMPLATES)
+def page_template(index: int, size_kb: int) -> bytes:
+    return synthetic_page(index, size_kb).encode('utf-8')
+
+def page_body(index: int, size_kb: int) -> bytes:
+    """Body of page ``index``, cheap enough that the server never limits a benchmark."""
+    template = index % PAGE_TEMPLATES
+    body = page_template(template, size_kb)
+    if template == index:
+        return body
+    return body.replace(f'<title>Page {template} '.encode(), f'<title>Page {index} '.encode(), 1)
+
+class MockDocHandler(BaseHTTPRequestHandler):
+    server_version = 'MockDocs/1.0'
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are separate writes; without this, delayed ACKs stall keep-alive clients ~40 ms
+    disable_nagle_algorithm = True
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+    def send(self, status: int, body: bytes, content_type: str = 'text/html; charset=utf-8', headers: Optional[dict] = None) -> None:
+        headers = dict(headers or {})
+        if self.server.site.options.compress and status == 200 and 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body, compresslevel=5)
+            headers['Content-Encoding'] = 'gzip'
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.site.record(len(body), status)
+
+    def do_GET(self) -> None:
+        site = self.server.site
+        path = self.path.split('?', 1)[0]
+        if path == '/_stats':
+            with site.lock:
+                body = json.dumps(site.stats).encode('utf-8')
+            self.send(200, body, 'application/json')
+            return
+
+        base = f'http://{self.headers.get("Host")}'
+        site.delay()
+        if path == '/robots.txt':
+            self.send(200, f'User-agent: *\nAllow: /\nSitemap: {base}/sitemap.xml\n'.encode('utf-8'), 'text/plain')
+            return
+
+        node = site.parse_sitemap_path(path)
+        if node is not None:
+            self.send(200, site.sitemap(base, *node), 'application/xml')
+            return
+
+        page = path[len('/docs/page-'):] if path.startswith('/docs/page-') else ''
+        if not page.isdigit() or int(page) >= site.options.pages:
+            self.send(404, b'Not found')
+            return
+        status = site.fault(path)
+        if status == 429:
+            self.send(429, b'Too many requests', headers={'Retry-After': '0'})
+        elif status is not None:
+            self.send(status, b'Internal server error')
+        else:
+            self.send(200, page_body(int(page), site.options.page_size))
+
+class MockDocServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, options: SiteOptions, host: str = '127.0.0.1', port: int = 0):
+        self.site = MockDocSite(options)
+        for index in range(min(options.pages, PAGE_TEMPLATES)):
+            page_template(index, options.page_size)
+        super().__init__((host, port), MockDocHandler)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+def add_site_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the SiteOptions flags shared with bench_crawl."""
+    parser.add_argument('--pages', type=int, default=1000)
+    parser.add_argument('--size', dest='page_size', type=int, default=40, help='approximate page size in KB')
+    parser.add_argument('--pages-per-sitemap', type=int, default=500)
+    parser.add_argument('--sitemaps-per-index', type=int, default=10)
+    parser.add_argument('--latency', type=float, default=0.0, help='mean response latency in ms (jittered +/-50%%)')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='fraction of pages answered 429 on first request')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of pages answered 500 on first request')
+    parser.add_argument('--compress', action='store_true', help='gzip responses for clients that accept it')
+    parser.add_argument('--seed', type=int, default=0)
+
+def site_options(args: argparse.Namespace) -> SiteOptions:
+    return SiteOptions(**{name: getattr(args, name) for name in asdict(SiteOptions())})
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_site_arguments(parser)
+    parser.add_argument('--port', type=int, default=8000)
+    args = parser.parse_args(argv)
+
+    server = MockDocServer(site_options(args), port=args.port)
+    print(f"Serving {args.pages} pages at {server.base_url}/docs/overview (sitemap levels: {len(server.site.levels)})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == '__main__':
+    main()
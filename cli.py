@@ -0,0 +1,232 @@
+"""Headless entry point for unattended (cron/CI) crawls.
+
+    python main.py --url https://cloud.google.com/storage/docs \
+        --include '*/storage/docs/*' --exclude 're:/release-notes' \
+        --max-pages 500 --since 2024-01-01
+
+Options may also come from a JSON file given with --config. Its keys are the
+option names below (e.g. "urls", "include", "max_pages"); a "crawler" object
+sets any other CrawlerConfig field. Command line options win over the file.
+"""
+import argparse
+import json
+import logging
+import sys
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+from utils.config import CrawlerConfig
+from utils.logging import setup_logging
+from utils.page_filter import PageFilter
+from utils.retry import RetryPolicy
+from utils.validator import validate_url
+from crawler.crawler import DocCrawler
+from crawler.async_crawler import AsyncDocCrawler
+from crawler.multi_site import MultiSiteCrawler
+
+logger = logging.getLogger(__name__)
+
+# Exit codes
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_PAGE_ERRORS = 3
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog='main.py',
+        description='Crawl documentation sites without interactive prompts.',
+        epilog="Patterns are shell globs matched against the whole URL, or regexes searched in it when prefixed with 're:'."
+    )
+    parser.add_argument('--config', help='JSON file with default option values')
+
+    source = parser.add_argument_group('pages')
+    source.add_argument('--url', dest='urls', action='append',
+                        help='base URL to crawl via its sitemap (repeatable; sites on different hosts are crawled side by side)')
+    source.add_argument('--url-file', help='file of page URLs to crawl directly, one per line')
+    source.add_argument('--include', action='append', help='only crawl URLs matching this pattern (repeatable)')
+    source.add_argument('--exclude', action='append', help='skip URLs matching this pattern (repeatable)')
+    source.add_argument('--max-pages', type=int, default=0, help='stop after this many pages (0 for no limit)')
+    source.add_argument('--since', help='only pages whose sitemap lastmod is on or after this ISO date')
+    source.add_argument('--language', default='en', help='documentation language (default: en)')
+    source.add_argument('--resume', action='store_true', help='resume the pages left by an interrupted crawl, if any')
+    source.add_argument('--list', action='store_true', help='print the selected URLs and exit without crawling')
+
+    output = parser.add_argument_group('output')
+    output.add_argument('--markdown', action=argparse.BooleanOptionalAction, default=True, help='store markdown (default: on)')
+    output.add_argument('--html', action='store_true', help='store raw HTML')
+    output.add_argument('--text', action='store_true', help='store the HTML as plain text files')
+    output.add_argument('--flatten', action='store_true', help='remove nested folders from output')
+    output.add_argument('--store-urls', action='store_true', help='write the discovered URLs to selected_urls/')
+    output.add_argument('--output-dir', help='output directory (default: downloaded_urls)')
+    output.add_argument('--output-format', choices=['files', 'jsonl', 'tar'], help='output layout (default: files)')
+    output.add_argument('--metrics-file', help='also write a JSON summary of per-stage timings, e.g. crawl_metrics.json')
+    output.add_argument('--prometheus-file', help='also write the metrics in Prometheus text format, e.g. for the node_exporter textfile collector')
+
+    crawl = parser.add_argument_group('crawl')
+    crawl.add_argument('--crawl-mode', choices=['auto', 'sitemap', 'links'],
+                       help="page discovery: sitemap, following links, or links only when no sitemap is found (default: auto)")
+    crawl.add_argument('--max-depth', type=int, help='link depth to follow in link crawl mode (default: 5)')
+    crawl.add_argument('--async', dest='async_engine', action='store_true', help='use the asyncio crawl engine')
+    crawl.add_argument('--max-workers', type=int, help='worker threads, or concurrent requests per site when crawling several sites (default: 10)')
+    crawl.add_argument('--shared-workers', type=int,
+                       help='worker threads shared by all sites of a multi-site crawl (default: max-workers per site, at most 64)')
+    crawl.add_argument('--lazy-titles', action='store_true', help='derive titles from URLs instead of fetching pages')
+    crawl.add_argument('--changed-only', action='store_true', help='skip pages whose sitemap lastmod has not changed')
+    crawl.add_argument('--http-cache', action='store_true', help='keep HTTP responses in an on-disk cache and reuse them on later runs')
+    crawl.add_argument('--http-cache-dir', help='HTTP cache directory (default: .crawler_cache/http)')
+    crawl.add_argument('--offline', action='store_true',
+                       help='replay the HTTP cache without network access and rewrite every page, e.g. after changing conversion settings')
+    crawl.add_argument('--quiet', action='store_true', help='no progress bar, for batch runs (logs are still written)')
+    crawl.add_argument('--debug', action='store_true', help='enable detailed statistics and debug logging')
+    return parser
+
+def load_config_file(path: str) -> Dict[str, Any]:
+    """Read option defaults from a JSON config file."""
+    with open(path, 'r', encoding='utf-8') as f:
+        options = json.load(f)
+    if not isinstance(options, dict):
+        raise ValueError(f"{path}: expected a JSON object")
+    return options
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    """Parse the command line on top of the defaults from --config."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.config:
+        try:
+            options = load_config_file(args.config)
+        except (OSError, ValueError) as e:
+            parser.error(f"Cannot read config file: {e}")
+        crawler_options = options.pop('crawler', {})
+        known = {action.dest for action in parser._actions}
+        unknown = set(options) - known
+        if unknown:
+            parser.error(f"Unknown options in {args.config}: {', '.join(sorted(unknown))}")
+        parser.set_defaults(**options)
+        args = parser.parse_args(argv)
+        args.crawler = crawler_options
+    else:
+        args.crawler = {}
+    return args
+
+def build_config(args: argparse.Namespace, base_url: str) -> CrawlerConfig:
+    """Build the crawler configuration from the parsed options."""
+    fields = dict(args.crawler)
+    if isinstance(fields.get('retry_policy'), dict):
+        fields['retry_policy'] = RetryPolicy(**fields['retry_policy'])
+    for name in ('content_selectors', 'url_include', 'url_exclude'):
+        if fields.get(name) is not None:
+            fields[name] = tuple(fields[name])
+    # Filter during the sitemap phase so excluded pages never have titles fetched
+    fields['url_include'] = fields.get('url_include', ()) + tuple(args.include or ())
+    fields['url_exclude'] = fields.get('url_exclude', ()) + tuple(args.exclude or ())
+    fields.update(base_url=base_url, language=args.language, debug=args.debug)
+    if args.lazy_titles:
+        fields['lazy_titles'] = True
+    if args.changed_only:
+        fields['changed_only'] = True
+    if args.quiet:
+        fields['quiet'] = True
+    if args.http_cache:
+        fields['http_cache'] = True
+    if args.offline:
+        fields['offline'] = True
+    if args.max_pages:
+        # Stop link discovery once enough pages are found
+        fields.setdefault('max_crawl_pages', args.max_pages)
+    for name in ('max_workers', 'shared_workers', 'output_dir', 'output_format', 'crawl_mode', 'max_depth', 'metrics_file', 'prometheus_file',
+                 'http_cache_dir'):
+        if getattr(args, name) is not None:
+            fields[name] = getattr(args, name)
+    return CrawlerConfig(**fields)
+
+def read_url_file(path: str) -> List[str]:
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+def run(args: argparse.Namespace) -> int:
+    """Run one headless crawl and return the process exit code."""
+    if not (args.markdown or args.html or args.text):
+        logger.error("No content would be stored; enable --markdown, --html or --text.")
+        return EXIT_USAGE
+
+    if bool(args.urls) == bool(args.url_file):
+        logger.error("Give either --url (one or more) or --url-file.")
+        return EXIT_USAGE
+
+    urls = args.urls or read_url_file(args.url_file)
+    for url in urls:
+        valid, error = validate_url(url)
+        if not valid:
+            logger.error(f"{error}: {url}")
+            return EXIT_USAGE
+
+    page_filter = PageFilter(args.include or (), args.exclude or (), args.since, args.max_pages)
+    crawler_class = AsyncDocCrawler if args.async_engine else DocCrawler
+    if len({urlparse(url).netloc for url in urls}) == 1:
+        crawler = crawler_class(build_config(args, urls[0]), urls)
+        return crawl_site(args, crawler, page_filter)
+
+    crawler = MultiSiteCrawler(build_config(args, urls[0]), urls, crawler_class)
+    try:
+        results = crawler.run(lambda site: crawl_site(args, site, page_filter))
+    finally:
+        crawler.close()
+    codes = set(results.values())
+    if None in codes or EXIT_FAILED in codes:
+        return EXIT_FAILED
+    return EXIT_PAGE_ERRORS if EXIT_PAGE_ERRORS in codes else EXIT_OK
+
+def crawl_site(args: argparse.Namespace, crawler: DocCrawler, page_filter: PageFilter) -> int:
+    """Select and crawl the pages of one site, returning its exit code."""
+    selected_urls = crawler.pending_pages() if args.resume else []
+    if selected_urls:
+        logger.info(f"Resuming interrupted crawl ({len(selected_urls)} pages remaining)")
+    elif args.url_file:
+        selected_urls = page_filter.select(crawler.base_urls)
+    else:
+        crawler.parse_sitemap(crawler.base_urls)
+        if not crawler.sitemap and crawler.display.stats['skipped']:
+            # e.g. --changed-only with nothing changed: a successful no-op run
+            logger.info(f"No new or changed pages for {crawler.domain}")
+            return EXIT_OK
+        if not crawler.sitemap:
+            logger.error(f"No pages found for {crawler.domain}!")
+            return EXIT_FAILED
+        selected_urls = crawler.filter_pages(page_filter)
+
+    if args.list:
+        for url in selected_urls:
+            print(url)
+        return EXIT_OK
+
+    if not selected_urls:
+        logger.warning("No pages selected.")
+        return EXIT_OK
+
+    if args.store_urls:
+        crawler.store_urls(selected_urls)
+
+    crawler.process_selected_pages(selected_urls, args.html, args.markdown, args.text, args.flatten)
+    errors = crawler.display.stats['errors']
+    if errors:
+        logger.warning(f"Processing complete with {errors} failed pages")
+        return EXIT_PAGE_ERRORS
+    logger.info("Processing complete!")
+    return EXIT_OK
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    setup_logging(logging.DEBUG if args.debug else logging.INFO)
+    try:
+        return run(args)
+    except ValueError as e:
+        logger.error(e)
+        return EXIT_USAGE
+    except KeyboardInterrupt:
+        logger.warning("Operation cancelled by user")
+        return EXIT_FAILED
+
+if __name__ == '__main__':
+    sys.exit(main())
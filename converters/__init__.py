@@ -1,3 +1,4 @@
-from .html_to_md import HTMLToMarkdownConverter
+from .html_to_md import HTMLToMarkdownConverter, ConvertedPage
+from .pool import ConversionPool
 
-__all__ = ["HTMLToMarkdownConverter"]
\ No newline at end of file
+__all__ = ["HTMLToMarkdownConverter", "ConvertedPage", "ConversionPool"]
\ No newline at end of file
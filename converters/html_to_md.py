@@ -1,28 +1,138 @@
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer, Tag
+from dataclasses import dataclass
 from markdownify import MarkdownConverter
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urldefrag, urljoin, urlparse
 import logging
 import re
+import time
 
 logger = logging.getLogger(__name__)
 
+# lxml builds trees several times faster than the pure-Python html.parser
+try:
+    import lxml  # noqa: F401
+    DEFAULT_PARSER = 'lxml'
+except ImportError:
+    DEFAULT_PARSER = 'html.parser'
+
+STRIPPED_TAGS = ['picture', 'header', 'footer', 'nav', 'script', 'style', 'button']
+
+# Tried in order; the first match is treated as the documentation body
+DEFAULT_CONTENT_SELECTORS = ('.devsite-article-body', 'article', 'main', '[role="main"]')
+
+@dataclass
+class ConvertedPage:
+    """Title and markdown produced from a single parse of a page."""
+    title: str
+    markdown: str
+    input_bytes: int = 0
+    output_bytes: int = 0
+    parse_time: float = 0.0
+    convert_time: float = 0.0
+    write_time: float = 0.0
+    markdown_hash: str = ''
+    output_stats: Optional[Dict[str, int]] = None
+
 class HTMLToMarkdownConverter:
     """Converts HTML content to Markdown format."""
     
     @staticmethod
-    def convert(html_content: str) -> str:
+    def parse(html_content: str, parser: Optional[str] = None) -> BeautifulSoup:
+        """Parse HTML with the requested backend, defaulting to the fastest installed."""
+        return BeautifulSoup(html_content, parser or DEFAULT_PARSER)
+
+    @staticmethod
+    def extract_content(soup: BeautifulSoup, selectors: Sequence[str]) -> Tag:
+        """Return the element holding the main documentation content.
+
+        Tries each CSS selector in turn, then falls back to the element whose
+        paragraphs carry the most text. Returns the whole document if nothing
+        stands out.
+        """
+        for selector in selectors:
+            element = soup.select_one(selector)
+            if element is not None:
+                return element
+
+        scores = {}
+        elements = {}
+        for paragraph in soup.find_all('p'):
+            length = len(paragraph.get_text(strip=True))
+            parent = paragraph.parent
+            grandparent = parent.parent if parent is not None else None
+            for element, weight in ((parent, 1.0), (grandparent, 0.5)):
+                if element is None:
+                    continue
+                elements[id(element)] = element
+                scores[id(element)] = scores.get(id(element), 0) + length * weight
+
+        if not scores:
+            return soup
+        best = elements[max(scores, key=scores.get)]
+        return best if best.name not in ('[document]', 'html', 'body') else soup
+
+    @classmethod
+    def convert_soup(cls, soup: BeautifulSoup, content_selectors: Optional[Sequence[str]] = None) -> str:
+        """Strip page chrome from a parsed document and convert it to markdown.
+
+        With content selectors, the tree is first pruned to the main content
+        so sidebars and boilerplate are never converted.
+        """
+        root = cls.extract_content(soup, content_selectors) if content_selectors is not None else soup
+        for element in root.find_all(STRIPPED_TAGS):
+            element.decompose()
+        return MarkdownConverter().convert_soup(root)
+
+    @classmethod
+    def convert(cls, html_content: str, parser: Optional[str] = None,
+                content_selectors: Optional[Sequence[str]] = None) -> str:
         """Convert HTML content to markdown."""
         if html_content is None or html_content == '':
             return ''
         
-        # Parse HTML content
-        soup = BeautifulSoup(html_content, 'html.parser')
-        for element in soup.find_all(['picture', 'header', 'footer', 'nav', 'script', 'style', 'button']):
-            element.decompose()
+        return cls.convert_soup(cls.parse(html_content, parser), content_selectors)
 
-        # Convert to markdown
-        markdown_content = MarkdownConverter().convert_soup(soup)
+    @classmethod
+    def convert_page(cls, html_content: str, url: str, parser: Optional[str] = None,
+                     content_selectors: Optional[Sequence[str]] = None) -> ConvertedPage:
+        """Extract the title and markdown of a page from one parse tree, with timings."""
+        if html_content is None or html_content == '':
+            return ConvertedPage(title=url, markdown='')
         
-        return markdown_content
+        started = time.perf_counter()
+        soup = cls.parse(html_content, parser)
+        parsed = time.perf_counter()
+        title = cls.clean_title(soup.title.string if soup.title else None, url)
+        markdown = cls.convert_soup(soup, content_selectors)
+        return ConvertedPage(
+            title=title,
+            markdown=markdown,
+            input_bytes=len(html_content.encode('utf-8')),
+            output_bytes=len(markdown.encode('utf-8')),
+            parse_time=parsed - started,
+            convert_time=time.perf_counter() - parsed
+        )
+
+    @classmethod
+    def extract_title(cls, html_content: str, url: str, parser: Optional[str] = None) -> str:
+        """Read only the <title> element without building the full tree."""
+        soup = BeautifulSoup(html_content, parser or DEFAULT_PARSER, parse_only=SoupStrainer('title'))
+        return cls.clean_title(soup.title.string if soup.title else None, url)
+
+    @classmethod
+    def extract_title_and_links(cls, html_content: str, url: str,
+                                parser: Optional[str] = None) -> Tuple[str, List[str]]:
+        """Read the title and absolute http(s) link targets (without fragments) in one pass."""
+        soup = BeautifulSoup(html_content, parser or DEFAULT_PARSER, parse_only=SoupStrainer(['title', 'a', 'base']))
+        base = soup.find('base', href=True)
+        base_url = urljoin(url, base['href']) if base else url
+        links = []
+        for anchor in soup.find_all('a', href=True):
+            link = urldefrag(urljoin(base_url, anchor['href'].strip())).url
+            if link.startswith(('http://', 'https://')):
+                links.append(link)
+        return cls.clean_title(soup.title.string if soup.title else None, url), links
 
     @staticmethod
     def clean_title(title: str, url: str) -> str:
@@ -33,4 +143,15 @@ class HTMLToMarkdownConverter:
         # Remove common suffixes
         title = re.sub(r'\s*\|\s*Google Cloud$', '', title)
 
-        return title.strip()
\ No newline at end of file
+        return title.strip()
+
+    @staticmethod
+    def title_from_url(url: str) -> str:
+        """Derive a readable title from the last URL path segment."""
+        slug = urlparse(url).path.rstrip('/').rsplit('/', 1)[-1]
+        if not slug:
+            return url
+
+        slug = re.sub(r'\.(html?|php|aspx?)$', '', slug)
+        words = re.sub(r'[-_]+', ' ', slug).strip()
+        return words[:1].upper() + words[1:] if words else url
\ No newline at end of file
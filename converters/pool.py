@@ -0,0 +1,90 @@
+import concurrent.futures
+import logging
+import multiprocessing
+import time
+from dataclasses import replace
+from pathlib import Path
+from threading import BoundedSemaphore, Lock
+from typing import Callable, Optional, Sequence
+
+from utils.output_store import OutputStore
+from .html_to_md import ConvertedPage, HTMLToMarkdownConverter
+
+logger = logging.getLogger(__name__)
+
+def convert_to_file(html_content: str, url: str, filepath: str, parser: Optional[str] = None,
+                    content_selectors: Optional[Sequence[str]] = None,
+                    output_store: Optional[OutputStore] = None) -> ConvertedPage:
+    """Convert HTML to markdown and write it, returning the conversion stats.
+
+    Runs inside a worker process so conversion does not hold the GIL of the
+    fetching process. The markdown itself is not sent back, only its digest,
+    unless there is no output store and the caller writes it instead.
+    """
+    converted = HTMLToMarkdownConverter.convert_page(html_content, url, parser, content_selectors)
+    if output_store is None:
+        return converted
+    started = time.perf_counter()
+    digest = output_store.write(Path(filepath), converted.markdown.encode('utf-8'), meta={'url': url, 'title': converted.title})
+    # The store was pickled for this task, so its stats are exactly this write
+    return replace(
+        converted, markdown='', markdown_hash=digest, output_stats=output_store.stats,
+        write_time=time.perf_counter() - started
+    )
+
+class ConversionPool:
+    """Process pool conversion stage fed by the network workers.
+
+    At most ``max_pending`` documents are queued; submit() blocks once the queue
+    is full so fetching cannot outrun conversion. Workers are spawned rather
+    than forked: the crawler has live threads and held locks (logging, SQLite,
+    the connection pool) that a forked child would inherit mid-use.
+    """
+
+    def __init__(self, workers: int, max_pending: int, parser: Optional[str] = None,
+                 content_selectors: Optional[Sequence[str]] = None,
+                 output_store: Optional[OutputStore] = None):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.parser = parser
+        self.content_selectors = content_selectors
+        self.output_store = output_store
+        self.executor = None
+        self.slots = BoundedSemaphore(max_pending)
+        # submit() is called from every fetch worker, so the executor is created once under a lock
+        self.lock = Lock()
+
+    def start(self) -> concurrent.futures.ProcessPoolExecutor:
+        with self.lock:
+            if self.executor is None:
+                self.executor = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context('spawn')
+                )
+            return self.executor
+
+    def submit(self, html_content: str, url: str, filepath: Path, on_done: Callable[[concurrent.futures.Future], None]) -> concurrent.futures.Future:
+        """Queue a document for conversion, blocking while the queue is full."""
+        executor = self.start()
+        self.slots.acquire()
+        try:
+            future = executor.submit(
+                convert_to_file, html_content, url, str(filepath), self.parser, self.content_selectors,
+                self.output_store
+            )
+        except Exception:
+            self.slots.release()
+            raise
+
+        def release(done: concurrent.futures.Future) -> None:
+            self.slots.release()
+            on_done(done)
+
+        future.add_done_callback(release)
+        return future
+
+    def shutdown(self) -> None:
+        """Wait for queued conversions to finish and stop the workers."""
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
@@ -1,3 +1,5 @@
 from .crawler import DocCrawler
+from .async_crawler import AsyncDocCrawler
+from .multi_site import MultiSiteCrawler
 
-__all__ = ["DocCrawler"]
\ No newline at end of file
+__all__ = ["DocCrawler", "AsyncDocCrawler", "MultiSiteCrawler"]
\ No newline at end of file
@@ -0,0 +1,510 @@
+import asyncio
+import logging
+import time
+from contextlib import aclosing, asynccontextmanager
+from typing import AsyncIterator, Awaitable, List, Optional, Tuple
+
+import aiohttp
+
+from crawler.crawler import PLAN_BATCH_SIZE, STREAM_CHUNK_SIZE, DocCrawler
+from utils.body_cache import BodySink, CachedBody, charset_from_headers
+from utils.config import CrawlerConfig
+from utils.http_cache import CacheEntry
+from utils.rate_limiter import AdaptiveConcurrency, parse_retry_after
+from utils.sitemap import SitemapEntry, SitemapStreamParser
+from utils.transport import ACCEPT_ENCODING, ContentDecoder
+
+logger = logging.getLogger(__name__)
+
+class FetchResult:
+    """Minimal response view shared by the async fetch helpers."""
+
+    def __init__(self, url: str, status: int, headers: dict, body: CachedBody):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+class AsyncDocCrawler(DocCrawler):
+    """Crawler that runs sitemap and page fetches concurrently on one event loop.
+
+    Shares configuration, URL filtering, conversion and state handling with
+    DocCrawler; only the network I/O is replaced. CPU-bound conversion and
+    disk I/O (state store, HTTP cache, spool files) are offloaded to the
+    loop's default executor.
+    """
+
+    def __init__(self, config: CrawlerConfig, base_urls: List[str]):
+        super().__init__(config, base_urls)
+        self.session = None
+        self.semaphore = None
+        self.slot_freed = None
+        self.async_concurrency = None
+        if config.adaptive_concurrency:
+            self.async_concurrency = AdaptiveConcurrency(maximum=config.async_concurrency)
+
+    async def _open(self) -> None:
+        self.semaphore = asyncio.Semaphore(self.config.async_concurrency)
+        self.slot_freed = asyncio.Condition()
+        connector = aiohttp.TCPConnector(
+            limit=self.config.async_concurrency,
+            limit_per_host=self.config.async_concurrency
+        )
+        # Bodies are decoded by iter_body so the bytes on the wire can be counted. The
+        # timeout applies per connect and per read, like the threaded engine's, so
+        # large bodies may take longer than it in total
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            trace_configs=[self.trace_config()],
+            auto_decompress=False,
+            headers={'User-Agent': self.config.user_agent, 'Accept-Encoding': ACCEPT_ENCODING},
+            timeout=aiohttp.ClientTimeout(
+                total=None, sock_connect=self.config.timeout, sock_read=self.config.timeout
+            )
+        )
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """Record connect and TTFB times of every request in the metrics."""
+        async def on_request_start(session, context, params) -> None:
+            context.started = time.monotonic()
+            context.connect = 0.0
+
+        async def on_connection_create_start(session, context, params) -> None:
+            context.connecting = time.monotonic()
+
+        async def on_connection_create_end(session, context, params) -> None:
+            context.connect += time.monotonic() - context.connecting
+
+        async def on_request_end(session, context, params) -> None:
+            if context.connect:
+                self.metrics.observe('connect', context.connect)
+            self.metrics.observe('ttfb', time.monotonic() - context.started - context.connect)
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_create_start.append(on_connection_create_start)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_request_end.append(on_request_end)
+        return trace_config
+
+    async def _close(self) -> None:
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    @asynccontextmanager
+    async def request_slot(self):
+        """Admit one request through the rate limiter and concurrency controls.
+
+        Yields a dict the caller fills with 'status' and 'retry_after' so the
+        adaptive controller can react to the response.
+        """
+        queued = time.monotonic()
+        controller = self.async_concurrency
+        if controller is not None:
+            async with self.slot_freed:
+                while not controller.try_acquire():
+                    # Woken when a request finishes, or when a Retry-After pause ends
+                    pause = controller.paused_until - time.monotonic()
+                    try:
+                        await asyncio.wait_for(self.slot_freed.wait(), pause if pause > 0 else None)
+                    except asyncio.TimeoutError:
+                        pass
+        if self.rate_limiter is not None:
+            wait = self.rate_limiter.reserve()
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+        outcome = {'status': None, 'retry_after': None}
+        started = time.monotonic()
+        try:
+            async with self.semaphore:
+                self.metrics.observe('queue', time.monotonic() - queued)
+                yield outcome
+        finally:
+            if controller is not None:
+                controller.release(time.monotonic() - started, outcome['status'], outcome['retry_after'])
+                async with self.slot_freed:
+                    self.slot_freed.notify(max(int(controller.limit) - controller.in_flight, 1))
+
+    async def iter_body(self, response: aiohttp.ClientResponse) -> AsyncIterator[bytes]:
+        """Yield a response body decoded chunk by chunk, counting wire and decoded bytes."""
+        decoder = ContentDecoder(response.headers.get('Content-Encoding'))
+        wire = decoded = 0
+        try:
+            async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+                wire += len(chunk)
+                data = decoder.decompress(chunk)
+                if data:
+                    decoded += len(data)
+                    yield data
+            data = decoder.flush()
+            if data:
+                decoded += len(data)
+                yield data
+        finally:
+            self.transport.record_bytes(wire, decoded)
+
+    def _record_response(self, outcome: dict, response: aiohttp.ClientResponse) -> None:
+        outcome['status'] = response.status
+        outcome['retry_after'] = parse_retry_after(response.headers.get('Retry-After'))
+
+    def cached_result(self, entry: CacheEntry, spool: bool, max_bytes: int) -> FetchResult:
+        """Serve a response from the HTTP cache as if it had been fetched."""
+        sink = BodySink(max_bytes, self.spool_dir if spool else None)
+        try:
+            sink.check_length(entry.headers.get('Content-Length'))
+            self.http_cache.read(entry, sink)
+        except BaseException:
+            sink.abort()
+            raise
+        return FetchResult(
+            url=entry.final_url,
+            status=entry.status,
+            headers=dict(entry.headers),
+            body=sink.finish(CachedBody(
+                url=entry.url,
+                etag=entry.headers.get('ETag'),
+                last_modified=entry.headers.get('Last-Modified'),
+                final_url=entry.final_url,
+                encoding=charset_from_headers(entry.headers)
+            ))
+        )
+
+    @asynccontextmanager
+    async def open_response(self, url: str, headers: Optional[dict] = None) -> AsyncIterator[aiohttp.ClientResponse]:
+        """Open a GET response with retry logic, like make_request with stream=True.
+
+        Transient failures are retried with exponential backoff and jitter,
+        honouring Retry-After, until a successful status arrives; the response
+        is then yielded for the caller to read. Errors raised while it is read
+        are not retried.
+        """
+        policy = self.config.retry_policy
+        for attempt in range(policy.max_attempts):
+            self.circuit_breaker.before_request()
+            retry_after = None
+            opened = False
+            try:
+                async with self.request_slot() as outcome:
+                    async with self.session.get(url, headers=headers) as response:
+                        self._record_response(outcome, response)
+                        response.raise_for_status()
+                        self.circuit_breaker.record_success()
+                        opened = True
+                        yield response
+                        return
+            except aiohttp.ClientResponseError as e:
+                if opened:
+                    raise
+                if not policy.is_retryable_status(e.status):
+                    # The origin answered; a missing page is no sign of it failing
+                    self.circuit_breaker.record_success()
+                    raise
+                retry_after = parse_retry_after((e.headers or {}).get('Retry-After'))
+                self.circuit_breaker.record_failure()
+                if attempt + 1 >= policy.max_attempts or not self.circuit_breaker.spend_retry():
+                    raise
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                if opened:
+                    raise
+                self.circuit_breaker.record_failure()
+                if attempt + 1 >= policy.max_attempts or not self.circuit_breaker.spend_retry():
+                    raise
+            await asyncio.sleep(policy.backoff(attempt, retry_after))
+
+    async def make_request_async(self, url: str, headers: Optional[dict] = None, spool: bool = False,
+                                 max_bytes: Optional[int] = None) -> FetchResult:
+        """Make HTTP request with retry logic without blocking the event loop.
+
+        The body is streamed through a BodySink like the threaded engine's
+        read_body: hashed as it arrives, capped at max_body_size (or
+        ``max_bytes``) and, with ``spool``, written to the spool directory
+        instead of memory. With http_cache enabled, fresh cache entries are
+        served without a request, stale ones are revalidated and cacheable
+        responses are stored.
+        """
+        if max_bytes is None:
+            max_bytes = self.config.max_body_size
+        # The HTTP cache and spool files are on disk, so they are used from the executor
+        loop = asyncio.get_running_loop()
+        entry = None
+        if self.http_cache is not None:
+            entry, headers = await loop.run_in_executor(None, self.http_cache.prepare, url, headers)
+            if headers is None:
+                return await loop.run_in_executor(None, self.cached_result, entry, spool, max_bytes)
+
+        async with self.open_response(url, headers) as response:
+            if response.status == 304 and entry is not None:
+                entry = await loop.run_in_executor(None, self.http_cache.refresh, entry, response.headers)
+                return await loop.run_in_executor(None, self.cached_result, entry, spool, max_bytes)
+            reading = time.monotonic()
+            sink = await loop.run_in_executor(None, BodySink, max_bytes, self.spool_dir) if spool else BodySink(max_bytes)
+            try:
+                sink.check_length(response.headers.get('Content-Length'))
+                async with aclosing(self.iter_body(response)) as chunks:
+                    async for chunk in chunks:
+                        if spool:
+                            await loop.run_in_executor(None, sink.feed, chunk)
+                        else:
+                            sink.feed(chunk)
+            except BaseException:
+                sink.abort()
+                raise
+            self.metrics.observe('download', time.monotonic() - reading)
+            self.metrics.observe_bytes('response_bytes', sink.size)
+            result = FetchResult(
+                url=str(response.url),
+                status=response.status,
+                headers=dict(response.headers),
+                body=sink.finish(CachedBody(
+                    url=url,
+                    etag=response.headers.get('ETag'),
+                    last_modified=response.headers.get('Last-Modified'),
+                    final_url=str(response.url),
+                    encoding=charset_from_headers(response.headers)
+                ))
+            )
+            if self.http_cache is not None and self.http_cache.is_cacheable(response.status, response.headers):
+                await loop.run_in_executor(
+                    None, self.http_cache.store, url, result.url, result.status, response.headers, result.body
+                )
+            return result
+
+    async def resolve_page_async(self, url: str) -> Optional[Tuple[str, str]]:
+        """Fetch a page, retain its body and return its (URL, title) entry.
+
+        Like resolve_page, the request is conditional, and the entry follows
+        redirects and is None when the redirect target is already known.
+        """
+        if self.config.lazy_titles:
+            return url, self.converter.title_from_url(url)
+
+        loop = asyncio.get_running_loop()
+        try:
+            headers = await loop.run_in_executor(None, self.conditional_headers, url)
+            response = await self.make_request_async(url, headers=headers)
+            if response.status == 304:
+                self.mark_not_modified(url)
+                return url, self.converter.title_from_url(url)
+            target = self.follow_redirect(url, response.url or url, self.visited_urls)
+            if target is None:
+                return None
+            page = response.body
+            page.url = target
+            # May spill older bodies to disk
+            await loop.run_in_executor(None, self.body_cache.put, page)
+            html = page.text
+            return target, await loop.run_in_executor(None, self.extract_title, html, target)
+        except Exception as e:
+            logger.debug(f"Could not get title for {url}: {e}")
+            return url, url
+
+    async def resolve_pages_async(self, sitemap_url: str, batch: List[SitemapEntry]) -> List[asyncio.Task]:
+        """Plan a batch of sitemap entries and start resolving its pages."""
+        if not batch:
+            return []
+        # Planning reads the state store in changed-only mode
+        loop = asyncio.get_running_loop()
+        page_urls = await loop.run_in_executor(None, self.plan_sitemap_batch, sitemap_url, batch)
+        return [asyncio.create_task(self.resolve_page_async(page_url)) for page_url in page_urls]
+
+    async def process_sitemap_url_async(self, url: str) -> List[Tuple[str, str]]:
+        """Discover the pages of a sitemap listed in the top-level sitemap."""
+        try:
+            if not self.url_processor.claim_sitemap(url):
+                return []
+            # Entries are planned in batches as they stream in, and their pages
+            # start resolving while the rest of the sitemap downloads
+            tasks = []
+            batch = []
+            try:
+                async with aclosing(self.iter_sitemap_async(url)) as entries:
+                    async for entry in entries:
+                        batch.append(entry)
+                        if len(batch) >= PLAN_BATCH_SIZE:
+                            tasks.extend(await self.resolve_pages_async(url, batch))
+                            batch = []
+                tasks.extend(await self.resolve_pages_async(url, batch))
+                pages = await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                raise
+            return [page for page in pages if page is not None]
+
+        except Exception as e:
+            self.display.update_stats(errors=1)
+            logger.error(f"Error processing URL {url}: {e}")
+            return []
+
+    async def process_sitemap_chunk_async(self, page_urls: List[str]) -> List[Tuple[str, str]]:
+        """Resolve a chunk of pages planned from the top-level sitemap."""
+        pages = await asyncio.gather(*(self.resolve_page_async(url) for url in page_urls))
+        return [page for page in pages if page is not None]
+
+    async def sitemap_chunks(self, sitemap_url: str) -> AsyncIterator[bytes]:
+        """Yield a sitemap's decoded body as it downloads.
+
+        With http_cache enabled the sitemap goes through make_request_async
+        (uncapped, spooled to disk) so it is cached and can be replayed offline.
+        """
+        if self.http_cache is not None:
+            page = (await self.make_request_async(sitemap_url, spool=True, max_bytes=0)).body
+            loop = asyncio.get_running_loop()
+            try:
+                with page.path.open('rb') as f:
+                    while chunk := await loop.run_in_executor(None, f.read, STREAM_CHUNK_SIZE):
+                        yield chunk
+            finally:
+                page.discard()
+            return
+
+        async with self.open_response(sitemap_url) as response:
+            async with aclosing(self.iter_body(response)) as chunks:
+                async for chunk in chunks:
+                    yield chunk
+
+    async def stream_sitemap_async(self, sitemap_url: str) -> AsyncIterator[SitemapEntry]:
+        """Yield the entries of a single sitemap document as it downloads."""
+        parser = SitemapStreamParser()
+        async with aclosing(self.sitemap_chunks(sitemap_url)) as chunks:
+            async for chunk in chunks:
+                for entry in parser.feed(chunk):
+                    yield entry
+        for entry in parser.close():
+            yield entry
+
+    async def iter_sitemap_async(self, sitemap_url: str) -> AsyncIterator[SitemapEntry]:
+        """Stream page entries from a sitemap, recursively following indexes."""
+        nested = []
+        async with aclosing(self.stream_sitemap_async(sitemap_url)) as entries:
+            async for entry in entries:
+                if entry.is_sitemap:
+                    nested.append(entry.loc)
+                else:
+                    yield entry
+
+        for nested_url in nested:
+            if not self.url_processor.claim_sitemap(nested_url):
+                continue
+            try:
+                async for entry in self.iter_sitemap_async(nested_url):
+                    yield entry
+            except Exception as e:
+                logger.error(f"Error parsing sitemap {nested_url}: {e}")
+
+    async def _parse_sitemap(self, sitemap_url: str) -> None:
+        await self._open()
+        try:
+            with self.display.create_progress_bar(0) as pbar:
+                async def run(results: Awaitable[List[Tuple[str, str]]], size: int) -> None:
+                    results = await results
+                    with self.sitemap_lock:
+                        for page_url, title in results:
+                            self.sitemap[page_url] = title
+                    pbar.update(size)
+
+                async def plan(batch: List[SitemapEntry]) -> None:
+                    # Planning reads the state store in changed-only mode
+                    nested, page_urls = await loop.run_in_executor(None, self.plan_index_batch, sitemap_url, batch)
+                    for url in nested:
+                        tasks.append(asyncio.create_task(run(self.process_sitemap_url_async(url), 1)))
+                    for i in range(0, len(page_urls), self.config.chunk_size):
+                        chunk = page_urls[i:i + self.config.chunk_size]
+                        tasks.append(asyncio.create_task(run(self.process_sitemap_chunk_async(chunk), len(chunk))))
+                    pbar.total += len(nested) + len(page_urls)
+                    pbar.refresh()
+
+                loop = asyncio.get_running_loop()
+                tasks = []
+                listed = 0
+                try:
+                    batch = []
+                    try:
+                        async with aclosing(self.stream_sitemap_async(sitemap_url)) as entries:
+                            async for entry in entries:
+                                batch.append(entry)
+                                if len(batch) >= PLAN_BATCH_SIZE:
+                                    listed += len(batch)
+                                    await plan(batch)
+                                    batch = []
+                        listed += len(batch)
+                        await plan(batch)
+                    except Exception as e:
+                        # Keep whatever was planned before the stream failed
+                        logger.error(f"Error parsing sitemap {sitemap_url}: {e}")
+                    logger.info(f"Found {listed} potential sitemaps/URLs")
+                    await asyncio.gather(*tasks)
+                except BaseException:
+                    for task in tasks:
+                        task.cancel()
+                    raise
+        finally:
+            await self._close()
+
+    def parallel_sitemap_processing(self, sitemap_url: str) -> None:
+        """Process the top-level sitemap concurrently on an event loop."""
+        asyncio.run(self._parse_sitemap(sitemap_url))
+
+    async def fetch_page_async(self, url: str, spool: bool = False) -> Optional[CachedBody]:
+        """Return the page body and validators, or None if it is not modified.
+
+        The async counterpart of fetch_page.
+        """
+        if self.take_not_modified(url):
+            return None
+        # The cached body may have been spilled to disk, and the validators are in the state store
+        loop = asyncio.get_running_loop()
+        cached = await loop.run_in_executor(None, self.body_cache.pop, url)
+        if cached is not None:
+            return cached
+
+        headers = await loop.run_in_executor(None, self.conditional_headers, url)
+        response = await self.make_request_async(url, headers=headers, spool=spool)
+        if response.status == 304:
+            response.body.discard()
+            return None
+        return response.body
+
+    async def process_page_async(self, url: str, store_raw_html: bool, store_markdown: bool, store_text: bool, store_flatten: bool) -> None:
+        """Download a page on the loop and convert/save it in the executor."""
+        started = time.perf_counter()
+        page = None
+        try:
+            spool = (store_raw_html or store_text) and not store_markdown
+            page = await self.fetch_page_async(url, spool)
+            # The skip helpers update the state store
+            loop = asyncio.get_running_loop()
+            if page is None:
+                await loop.run_in_executor(None, self.skip_not_modified, url)
+                return
+            if await loop.run_in_executor(None, self.skip_redirect_duplicate, page):
+                return
+            await loop.run_in_executor(
+                None, self.save_page, page, store_raw_html, store_markdown, store_text, store_flatten
+            )
+            self.metrics.observe('page', time.perf_counter() - started)
+        except Exception as e:
+            self.display.update_stats(errors=1)
+            logger.error(f"Error processing {url}: {e}")
+        finally:
+            if page is not None:
+                page.discard()
+
+    async def _process_pages(self, selected_urls: List[str], store_raw_html: bool, store_markdown: bool, store_text: bool, store_flatten: bool) -> None:
+        await self._open()
+        try:
+            with self.display.create_progress_bar(len(selected_urls)) as pbar:
+                async def run(url: str) -> None:
+                    await self.process_page_async(url, store_raw_html, store_markdown, store_text, store_flatten)
+                    pbar.update(1)
+
+                await asyncio.gather(*(run(url) for url in selected_urls))
+        finally:
+            await self._close()
+
+    def parallel_page_processing(self, selected_urls: List[str], store_raw_html: bool, store_markdown: bool, store_text: bool, store_flatten: bool) -> None:
+        """Process selected pages concurrently on an event loop."""
+        asyncio.run(self._process_pages(selected_urls, store_raw_html, store_markdown, store_text, store_flatten))
+        self.finish_page_processing()
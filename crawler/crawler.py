@@ -2,24 +2,41 @@ import os
 import concurrent.futures
 import logging
 import shutil
-from bs4 import BeautifulSoup
+from contextlib import closing
+from itertools import islice
 from pathlib import Path
-from typing import List, Tuple
+from typing import Iterable, List, Optional, Tuple
 from urllib.parse import urlparse
 from threading import Lock
-from xml.etree import ElementTree as ET
 import requests
 import time
 import hashlib
-import json
 
 from utils.config import CrawlerConfig
 from utils.display import UnifiedDisplay
 from utils.url_processor import URLProcessor
-from converters.html_to_md import HTMLToMarkdownConverter
+from utils.sitemap import SitemapEntry, is_sitemap_url, parse_lastmod
+from utils.transport import HTTPTransport
+from utils.http_cache import HTTPCache, OfflineCacheMiss
+from utils.rate_limiter import AdaptiveConcurrency, TokenBucket, parse_retry_after
+from utils.retry import CircuitBreaker
+from utils.body_cache import BodyCache, BodySink, CachedBody, charset_from_headers
+from utils.state_store import open_state_store
+from utils.output_store import open_output_store
+from utils.page_filter import PageFilter
+from utils.frontier import SeenSet
+from utils.metrics import Metrics
+from converters.html_to_md import HTMLToMarkdownConverter, ConvertedPage, DEFAULT_CONTENT_SELECTORS
+from converters.pool import ConversionPool
 
 logger = logging.getLogger(__name__)
 
+# Sitemap entries checked for relevance per batch
+PLAN_BATCH_SIZE = 1000
+
+# Bytes read per iteration when streaming response bodies
+STREAM_CHUNK_SIZE = 64 * 1024
+
 class DocCrawler:
     """Main crawler class that orchestrates the documentation crawling process."""
     
@@ -32,14 +49,17 @@ class DocCrawler:
         for url in base_urls:
             parsed_url = urlparse(url)
             if parsed_url.netloc != first_domain:
-                raise ValueError(f"Base URLs must be from the same domain: {first_domain} != {parsed_url.netloc}")
+                raise ValueError(
+                    f"Base URLs must be from the same domain: {first_domain} != {parsed_url.netloc} "
+                    "(use MultiSiteCrawler to crawl several sites)"
+                )
         
         self.config = config
         self.base_urls = base_urls
         self.domain = first_domain
         
         # Initialize display
-        self.display = UnifiedDisplay(debug=config.debug)
+        self.display = UnifiedDisplay(debug=config.debug, quiet=config.quiet, update_interval=config.progress_interval)
         
         # Extract base paths for filtering
         self.base_paths = []
@@ -51,152 +71,456 @@ class DocCrawler:
           self.base_paths.append('/'.join(path_parts))
         
         # Initialize components
+        self.metrics = Metrics()
+        self.rate_limiter = None
+        if config.rate_limit > 0:
+            self.rate_limiter = TokenBucket(rate=config.rate_limit, burst=config.rate_burst)
+        self.circuit_breaker = CircuitBreaker(config.retry_policy)
+        self.concurrency = None
+        if config.adaptive_concurrency:
+            self.concurrency = AdaptiveConcurrency(maximum=config.max_workers)
+        self.http_cache = None
+        if config.http_cache:
+            self.http_cache = HTTPCache(config.http_cache_dir, config.http_cache_size, offline=config.offline)
+        self.transport = HTTPTransport(
+            headers={'User-Agent': config.user_agent},
+            timeout=config.timeout,
+            pool_size=config.max_workers,
+            rate_limiter=self.rate_limiter,
+            concurrency=self.concurrency,
+            metrics=self.metrics,
+            cache=self.http_cache
+        )
         self.url_processor = URLProcessor(
             domain=self.domain,
             base_paths=self.base_paths,
             headers={'User-Agent': config.user_agent},
-            timeout=config.timeout
+            timeout=config.timeout,
+            transport=self.transport,
+            include=config.url_include,
+            exclude=config.url_exclude,
+            scheme=first_parsed_url.scheme
         )
         
         self.converter = HTMLToMarkdownConverter()
+        self.output_store = open_output_store(
+            config.output_dir, config.dedup_outputs, config.dedup_link_mode,
+            config.output_format, config.shard_size
+        )
+        self.markdown_digests = {}
+        self.content_selectors = None
+        if config.extract_main_content:
+            self.content_selectors = config.content_selectors or DEFAULT_CONTENT_SELECTORS
+        self.conversion_pool = None
+        if config.conversion_workers > 0:
+            self.conversion_pool = ConversionPool(
+                workers=config.conversion_workers,
+                max_pending=config.conversion_queue_size,
+                parser=config.html_parser,
+                content_selectors=self.content_selectors,
+                # Stores that can't run in a worker get the markdown back to write here
+                output_store=self.output_store if self.output_store.process_safe else None
+            )
+        self.body_cache = BodyCache(
+            max_memory_bytes=config.body_cache_size,
+            spill_dir=config.body_cache_dir
+        )
+        # Next to the outputs so spooled bodies can be renamed into place
+        self.spool_dir = self.output_store.output_dir / '.partial'
+        self.url_list_dir = Path('selected_urls')
+        # Set by MultiSiteCrawler to run this site's fetches on its shared workers
+        self.scheduler = None
         
-        # State management
+        # State management: canonical forms of the URLs claimed by discovery and by the current run
         self.visited_urls = set()
+        self.processed_urls = set()
+        self.redirects = {}
+        # Pages discovery found unchanged (HTTP 304), so the page phase skips them without a request
+        self.not_modified = set()
+        self.visited_lock = Lock()
         self.sitemap = {}
+        self.sitemap_meta = {}
         self.sitemap_lock = Lock()
-        self.state_file = Path("crawler_state.json") # Path for storing crawler state
-        self.page_states = self.load_state() # Load previous states if any.
+        self.state_store = open_state_store(config.state_backend, config.state_file) # Load previous states if any.
         
         logger.info(f"Initializing crawler for domain: {self.domain}")
         logger.info(f"Base paths filter: {self.base_paths}")
         logger.info(f"Language filter: {config.language}")
 
-    def make_request(self, url: str, method: str = 'get') -> requests.Response:
-        """Make HTTP request with retry logic."""
-        headers = {'User-Agent': self.config.user_agent}
-        
-        for attempt in range(self.config.max_retries):
+    def make_request(self, url: str, method: str = 'get', headers: Optional[dict] = None, stream: bool = False) -> requests.Response:
+        """Make HTTP request with retry logic.
+
+        Transient failures are retried with exponential backoff and jitter,
+        honouring Retry-After. Terminal statuses such as 404 raise immediately.
+        With http_cache enabled the transport answers from the cache first;
+        an offline cache miss is never retried.
+        """
+        policy = self.config.retry_policy
+        for attempt in range(policy.max_attempts):
+            self.circuit_breaker.before_request()
+            retry_after = None
             try:
                 if method == 'get':
-                    response = requests.get(
-                        url,
-                        headers=headers,
-                        timeout=self.config.timeout
-                    )
+                    response = self.transport.get(url, headers=headers, stream=stream)
                 response.raise_for_status()
+                self.circuit_breaker.record_success()
                 return response
-            except requests.RequestException as e:
-                if attempt + 1 < self.config.max_retries:
-                    time.sleep(self.config.retry_delay * (attempt + 1))
-                else:
+            except requests.HTTPError as e:
+                # Error bodies are never read; closing frees the connection and concurrency slot
+                e.response.close()
+                if not policy.is_retryable_status(e.response.status_code):
+                    # The origin answered; a missing page is no sign of it failing
+                    self.circuit_breaker.record_success()
+                    raise
+                retry_after = parse_retry_after(e.response.headers.get('Retry-After'))
+                self.circuit_breaker.record_failure()
+                if attempt + 1 >= policy.max_attempts or not self.circuit_breaker.spend_retry():
                     raise
+            except OfflineCacheMiss:
+                raise
+            except requests.RequestException:
+                self.circuit_breaker.record_failure()
+                if attempt + 1 >= policy.max_attempts or not self.circuit_breaker.spend_retry():
+                    raise
+            time.sleep(policy.backoff(attempt, retry_after))
+
+    def worker_pool(self) -> concurrent.futures.Executor:
+        """Return the executor for fetch work.
+
+        Normally max_workers threads of this crawler's own; under a
+        MultiSiteCrawler, this site's share of the shared workers.
+        """
+        if self.scheduler is not None:
+            return self.scheduler.executor(self.domain)
+        return concurrent.futures.ThreadPoolExecutor(max_workers=self.config.max_workers)
 
     def process_sitemap_url(self, url: str) -> List[Tuple[str, str]]:
-        """Process a single sitemap URL."""
+        """Discover the pages of a sitemap listed in the top-level sitemap."""
         try:
-            if url.endswith('.xml'):
-                response = self.make_request(url)
-                root = ET.fromstring(response.content)
-                namespaces = {'ns': 'http://www.sitemaps.org/schemas/sitemap/0.9'}
-                urls = root.findall('.//ns:loc', namespaces)
-                
-                results = []
-                for loc in urls:
-                    page_url = loc.text
-                    self.display.update_stats(
-                        processed=1,
-                        current_url=url
-                    )
-                    
-                    if not page_url.endswith('.xml') and self.url_processor.is_relevant_url(page_url, self.config.language):
-                        self.display.update_stats(relevant=1)
-                        title = self.get_page_title(page_url)
-                        results.append((page_url, title))
-                
-                return results
-                
-            elif self.url_processor.is_relevant_url(url, self.config.language):
-                self.display.update_stats(
-                    processed=1,
-                    relevant=1,
-                    current_url=url
-                )
-                return [(url, self.get_page_title(url))]
-            
-            self.display.update_stats(processed=1)
-            return []
+            if not self.url_processor.claim_sitemap(url):
+                return []
+            entries = self.url_processor.iter_sitemap(
+                url,
+                fetch=lambda sitemap_url: self.make_request(sitemap_url, stream=True)
+            )
+            page_urls = self.plan_sitemap_entries(url, entries)
+            return [page for page in map(self.resolve_page, page_urls) if page is not None]
             
         except Exception as e:
             self.display.update_stats(errors=1)
             logger.error(f"Error processing URL {url}: {e}")
             return []
 
-    def get_page_title(self, url: str) -> str:
-        """Extract and clean page title from URL."""
+    def plan_sitemap_entries(self, sitemap_url: str, entries: Iterable[SitemapEntry]) -> List[str]:
+        """Filter sitemap entries down to the relevant pages that need crawling.
+
+        Entries are filtered in batches so relevance checks and display
+        updates are not paid per entry.
+        """
+        page_urls = []
+        entries = iter(entries)
+        while True:
+            batch = list(islice(entries, PLAN_BATCH_SIZE))
+            if not batch:
+                break
+            page_urls.extend(self.plan_sitemap_batch(sitemap_url, batch))
+        return page_urls
+
+    def plan_index_batch(self, sitemap_url: str, batch: List[SitemapEntry]) -> Tuple[List[str], List[str]]:
+        """Split a batch of top-level sitemap entries into nested sitemaps and planned pages.
+
+        A top-level sitemap may list pages next to, or instead of, nested
+        sitemaps; those pages are planned like the pages of nested sitemaps.
+        """
+        nested = []
+        pages = []
+        for entry in batch:
+            if entry.is_sitemap or is_sitemap_url(entry.loc):
+                nested.append(entry.loc)
+            else:
+                pages.append(entry)
+        return nested, self.plan_sitemap_batch(sitemap_url, pages)
+
+    def plan_sitemap_batch(self, sitemap_url: str, batch: List[SitemapEntry]) -> List[str]:
+        """Return the relevant, unclaimed and changed pages of one batch of entries."""
+        pages = {}
+        for entry in batch:
+            if not entry.is_sitemap:
+                pages.setdefault(entry.loc, entry)
+        relevant = self.url_processor.filter_relevant(pages, self.config.language)
+        page_urls = []
+        skipped = 0
+        for url in relevant:
+            if not self.claim_url(url, self.visited_urls):
+                # Already listed under another spelling or in another sitemap
+                skipped += 1
+                continue
+            self.sitemap_meta[url] = pages[url]
+            if self.is_unchanged(url):
+                skipped += 1
+                continue
+            page_urls.append(url)
+        
+        self.display.update_stats(
+            processed=len(batch),
+            relevant=len(relevant),
+            skipped=skipped,
+            current_url=sitemap_url
+        )
+        return page_urls
+
+    def is_unchanged(self, url: str) -> bool:
+        """Check sitemap metadata against the last run in changed-only mode."""
+        if not self.config.changed_only:
+            return False
+        
+        entry = self.sitemap_meta.get(url)
+        state = self.state_store.get(self.state_key(url))
+        if entry is None or state is None:
+            return False
+        
+        current = parse_lastmod(entry.lastmod)
+        previous = parse_lastmod(state.get('lastmod'))
+        if current is not None and previous is not None:
+            return current <= previous
+        
+        return entry.lastmod is None and entry.changefreq == 'never'
+
+    def claim_url(self, url: str, claimed: set) -> bool:
+        """Claim a URL by its canonical form, returning False if it was already claimed."""
+        key = self.url_processor.canonicalize(url)
+        with self.visited_lock:
+            if key in claimed:
+                return False
+            claimed.add(key)
+            return True
+
+    def state_key(self, url: str) -> str:
+        """Return the state store key of a page, the same for every spelling of its URL."""
+        return self.url_processor.canonicalize(url)
+
+    def follow_redirect(self, url: str, final_url: str, claimed: set) -> Optional[str]:
+        """Record where a URL redirected to and claim the target.
+
+        Returns the URL to keep for the page: the URL itself unless it
+        redirected to a different page, else the target as served, or None
+        when the target was already claimed, i.e. the page is a duplicate of
+        one fetched or scheduled. The target inherits the URL's sitemap
+        metadata.
+        """
+        canonicalize = self.url_processor.canonicalize
+        if canonicalize(final_url) == canonicalize(url):
+            return url
+        with self.visited_lock:
+            self.redirects[url] = final_url
+        if not self.claim_url(final_url, claimed):
+            logger.debug(f"Skipping {url}: redirects to {final_url}, which is already claimed")
+            return None
+        entry = self.sitemap_meta.get(url)
+        if entry is not None:
+            self.sitemap_meta.setdefault(final_url, entry)
+        return final_url
+
+    def resolve_page(self, url: str, fetch: Optional[bool] = None) -> Optional[Tuple[str, str]]:
+        """Return the (URL, title) entry for a discovered page.
+
+        Fetching the title follows redirects: the entry is keyed on the
+        redirect target, or dropped when the target is already known. The
+        request is conditional on the stored validators; a page that is not
+        modified keeps a title derived from its URL and is not fetched again.
+        """
+        if fetch is None:
+            fetch = not self.config.lazy_titles
+        if not fetch:
+            return url, self.converter.title_from_url(url)
+
         try:
-            response = self.make_request(url)
-            soup = BeautifulSoup(response.text, 'html.parser')
-            title = soup.title.string if soup.title else url
-            return self.converter.clean_title(title, url)
+            response = self.make_request(url, headers=self.conditional_headers(url), stream=True)
+            if response.status_code == 304:
+                response.close()
+                self.mark_not_modified(url)
+                return url, self.converter.title_from_url(url)
+            target = self.follow_redirect(url, response.url or url, self.visited_urls)
+            if target is None:
+                response.close()
+                return None
+            page = self.read_body(target, response)
+            self.body_cache.put(page)
+            return target, self.extract_title(page.text, target)
         except Exception as e:
             logger.debug(f"Could not get title for {url}: {e}")
-            return url
+            return url, url
+
+    def get_page_title(self, url: str, fetch: Optional[bool] = None) -> str:
+        """Extract and clean page title from URL.
+
+        The fetched body is retained in the body cache so process_page can reuse
+        it. In lazy titles mode the title is derived from the URL instead unless
+        a fetch is explicitly requested.
+        """
+        page = self.resolve_page(url, fetch)
+        return page[1] if page is not None else url
+
+    def extract_title(self, html: str, url: str) -> str:
+        """Parse and clean the <title> of an HTML document."""
+        with self.metrics.time('title'):
+            return self.converter.extract_title(html, url, self.config.html_parser)
     
-    def process_sitemap_chunk(self, urls: List[str]) -> List[Tuple[str, str]]:
-        """Process a chunk of sitemap URLs."""
-        results = []
-        for url in urls:
-            try:
-                chunk_results = self.process_sitemap_url(url)
-                results.extend(chunk_results)
-            except Exception as e:
-                self.display.update_stats(errors=1)
-                logger.error(f"Error processing URL chunk: {e}")
-        return results
-
-    def parallel_sitemap_processing(self, sitemap_urls: List[str]) -> None:
-        """Process sitemap URLs in parallel with unified display."""
-        url_chunks = [
-            sitemap_urls[i:i + self.config.chunk_size] 
-            for i in range(0, len(sitemap_urls), self.config.chunk_size)
-        ]
-        
-        with concurrent.futures.ThreadPoolExecutor(max_workers=self.config.max_workers) as executor:
-            future_to_chunk = {
-                executor.submit(self.process_sitemap_chunk, chunk): chunk 
-                for chunk in url_chunks
-            }
-            
-            with self.display.create_progress_bar(len(sitemap_urls)) as pbar:
-                for future in concurrent.futures.as_completed(future_to_chunk):
+    def process_sitemap_chunk(self, page_urls: List[str]) -> List[Tuple[str, str]]:
+        """Resolve a chunk of pages planned from the top-level sitemap."""
+        return [page for page in map(self.resolve_page, page_urls) if page is not None]
+
+    def parallel_sitemap_processing(self, sitemap_url: str) -> None:
+        """Process the top-level sitemap in parallel with unified display.
+
+        The sitemap is streamed and its entries planned in batches. Each nested
+        sitemap, and each chunk of planned pages, goes to the worker pool as
+        soon as its batch is planned.
+        """
+        with self.worker_pool() as executor:
+            with self.display.create_progress_bar(0) as pbar:
+                future_to_size = {}
+                listed = 0
+                entries = self.url_processor.stream_sitemap(
+                    sitemap_url,
+                    fetch=lambda url: self.make_request(url, stream=True)
+                )
+                try:
+                    with closing(entries):
+                        while True:
+                            batch = list(islice(entries, PLAN_BATCH_SIZE))
+                            if not batch:
+                                break
+                            listed += len(batch)
+                            nested, page_urls = self.plan_index_batch(sitemap_url, batch)
+                            for url in nested:
+                                future_to_size[executor.submit(self.process_sitemap_url, url)] = 1
+                            for i in range(0, len(page_urls), self.config.chunk_size):
+                                chunk = page_urls[i:i + self.config.chunk_size]
+                                future_to_size[executor.submit(self.process_sitemap_chunk, chunk)] = len(chunk)
+                            pbar.total += len(nested) + len(page_urls)
+                            pbar.refresh()
+                except Exception as e:
+                    # Keep whatever was planned before the stream failed
+                    logger.error(f"Error parsing sitemap {sitemap_url}: {e}")
+                logger.info(f"Found {listed} potential sitemaps/URLs")
+                
+                for future in concurrent.futures.as_completed(future_to_size):
                     try:
                         results = future.result()
                         with self.sitemap_lock:
                             for url, title in results:
                                 self.sitemap[url] = title
-                        pbar.update(len(future_to_chunk[future]))
+                        pbar.update(future_to_size[future])
                         
                     except Exception as e:
                         self.display.update_stats(errors=1)
                         logger.error(f"Error processing chunk: {e}")
 
     def parse_sitemap(self, base_urls: List[str]) -> None:
-        """Parse XML sitemap and collect URLs."""
+        """Parse XML sitemap and collect URLs.
+
+        Falls back to following links from the base URLs when the site has no
+        sitemap (crawl_mode 'auto'), or always does so with crawl_mode 'links'.
+        """
+        if self.config.crawl_mode == 'links':
+            self.crawl_links(base_urls)
+            return
+
         sitemap_url = self.url_processor.find_sitemap_url(base_urls[0]) # use first url as the base
         if not sitemap_url:
+            if self.config.crawl_mode == 'auto':
+                logger.info("No sitemap found, following links from the base URLs instead")
+                self.crawl_links(base_urls)
+                return
             logger.error("No sitemap found!")
             return
 
         try:
             logger.info(f"Parsing main sitemap: {sitemap_url}")
-            sitemap_urls = self.url_processor.parse_sitemap(sitemap_url)
-            logger.info(f"Found {len(sitemap_urls)} potential sitemaps/URLs")
-            
-            self.parallel_sitemap_processing(sitemap_urls)
+            self.url_processor.claim_sitemap(sitemap_url)
+            self.parallel_sitemap_processing(sitemap_url)
             
         except Exception as e:
             logger.error(f"Error parsing sitemap: {e}")
 
+    def crawl_links(self, base_urls: List[str]) -> None:
+        """Discover pages breadth-first by following links from the base URLs.
+
+        Each depth level is fetched by the worker pool. Page bodies are kept in
+        the body cache for conversion, and links are filtered through the URL
+        processor and a compact seen-set before joining the next level.
+        """
+        seen = SeenSet()
+        canonicalize = self.url_processor.canonicalize
+        frontier = [url for url in self.url_processor.unique_urls(base_urls) if seen.add(canonicalize(url))]
+        max_pages = self.config.max_crawl_pages
+        
+        with self.worker_pool() as executor:
+            for depth in range(self.config.max_depth + 1):
+                if max_pages:
+                    frontier = frontier[:max_pages - len(self.sitemap)]
+                if not frontier:
+                    break
+                
+                logger.info(f"Crawling {len(frontier)} pages at depth {depth}")
+                next_frontier = []
+                with self.display.create_progress_bar(len(frontier)) as pbar:
+                    for url, title, links in executor.map(lambda url: self.crawl_page(url, seen), frontier):
+                        pbar.update(1)
+                        if title is None:
+                            continue
+                        self.sitemap[url] = title
+                        if depth < self.config.max_depth:
+                            links = self.url_processor.unique_urls(links)
+                            for link in self.url_processor.filter_relevant(links, self.config.language):
+                                if seen.add(canonicalize(link)):
+                                    next_frontier.append(link)
+                frontier = next_frontier
+        
+        logger.info(f"Link crawl found {len(self.sitemap)} pages ({len(seen)} URLs seen)")
+
+    def crawl_page(self, url: str, seen: SeenSet) -> Tuple[str, Optional[str], List[str]]:
+        """Fetch a page for the link crawl, returning its URL, title and outgoing links.
+
+        The URL is the redirect target as served. The title is None when the
+        page could not be fetched, is not HTML, or redirects to a page that
+        was already seen.
+        """
+        try:
+            response = self.make_request(url, stream=True)
+        except Exception as e:
+            self.display.update_stats(errors=1)
+            logger.debug(f"Could not fetch {url}: {e}")
+            return url, None, []
+        
+        self.display.update_stats(processed=1, current_url=url)
+        if 'html' not in response.headers.get('Content-Type', 'text/html'):
+            # Streaming means non-HTML bodies are never downloaded
+            response.close()
+            return url, None, []
+        
+        final_url = response.url or url
+        target = self.url_processor.canonicalize(final_url)
+        if target != self.url_processor.canonicalize(url):
+            with self.visited_lock:
+                self.redirects[url] = final_url
+            if not seen.add(target):
+                response.close()
+                return url, None, []
+            url = final_url
+        
+        try:
+            page = self.read_body(url, response)
+        except Exception as e:
+            self.display.update_stats(errors=1)
+            logger.debug(f"Could not read {url}: {e}")
+            return url, None, []
+        self.display.update_stats(relevant=1)
+        self.body_cache.put(page)
+        title, links = self.converter.extract_title_and_links(page.text, final_url, self.config.html_parser)
+        return url, title, links
+
     def select_pages(self) -> List[str]:
         """Interactive page selection interface."""
         # Clear terminal first
@@ -271,21 +595,71 @@ class DocCrawler:
         logger.info(f"Selected {len(selected_urls)} pages")
         return selected_urls
     
-    def calculate_hash(self, content: str) -> str:
-        """Calculate the SHA256 hash of content."""
-        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+    def filter_pages(self, page_filter: PageFilter) -> List[str]:
+        """Select pages by URL pattern, lastmod and page limit without prompting."""
+        selected_urls = page_filter.select(self.sitemap, self.sitemap_meta)
+        logger.info(f"Selected {len(selected_urls)} of {len(self.sitemap)} pages")
+        return selected_urls
+
+    def calculate_hash(self, content: bytes) -> str:
+        """Calculate the SHA256 hash of a raw page body."""
+        return hashlib.sha256(content).hexdigest()
     
-    def load_state(self) -> dict:
-        """Load previously stored state of crawled pages."""
-        if self.state_file.exists():
-            with self.state_file.open('r') as f:
-                return json.load(f)
-        return {}
+    def record_page_state(self, url: str, current_hash: str, etag: Optional[str], last_modified: Optional[str]) -> None:
+        """Remember a page's content hash, HTTP validators and sitemap metadata."""
+        state = {
+            'hash': current_hash,
+            'etag': etag,
+            'last_modified': last_modified
+        }
+        self._apply_sitemap_meta(url, state)
+        self.state_store.set(self.state_key(url), state)
+
+    def _apply_sitemap_meta(self, url: str, state: dict) -> None:
+        entry = self.sitemap_meta.get(url)
+        if entry is not None:
+            state['lastmod'] = entry.lastmod
+            state['changefreq'] = entry.changefreq
+
+    def conditional_headers(self, url: str) -> dict:
+        """Build If-None-Match / If-Modified-Since headers from stored validators."""
+        state = self.state_store.get(self.state_key(url)) or {}
+        headers = {}
+        if state.get('etag'):
+            headers['If-None-Match'] = state['etag']
+        if state.get('last_modified'):
+            headers['If-Modified-Since'] = state['last_modified']
+        return headers
+
+    def mark_not_modified(self, url: str) -> None:
+        """Remember that discovery got a 304 for a page."""
+        with self.visited_lock:
+            self.not_modified.add(url)
+
+    def take_not_modified(self, url: str) -> bool:
+        """Check whether discovery got a 304 for a page, forgetting it."""
+        with self.visited_lock:
+            if url not in self.not_modified:
+                return False
+            self.not_modified.discard(url)
+            return True
+
+    def skip_not_modified(self, url: str) -> None:
+        """Account for a page the server reported as unchanged (HTTP 304)."""
+        logger.info(f"Skipping {url}: Not modified")
+        state = self.state_store.get(self.state_key(url))
+        if state is not None:
+            self._apply_sitemap_meta(url, state)
+            self.state_store.set(self.state_key(url), state)
+        self.display.update_stats(processed=1, not_modified=1)
 
     def save_state(self) -> None:
         """Save current state of crawled pages."""
-        with self.state_file.open('w') as f:
-            json.dump(self.page_states, f, indent=4)
+        self.state_store.flush()
+
+    def pending_pages(self) -> List[str]:
+        """Return pages left unfinished by an interrupted crawl, if any."""
+        return self.state_store.pending()
 
     def _create_filepath(self, urlpath: str, store_flatten: bool, suffix: str) -> Path:
         """Create filepath based on flatten parameter."""
@@ -303,7 +677,7 @@ class DocCrawler:
         filename = Path(filename).with_suffix(suffix)
         
         
-        output_dir = Path('downloaded_urls')
+        output_dir = self.output_store.output_dir
         filepath = output_dir / filename
         
         if len(str(filepath)) > 255:
@@ -312,50 +686,190 @@ class DocCrawler:
           
         return filepath
 
+    def read_body(self, url: str, response: requests.Response, spool: bool = False) -> CachedBody:
+        """Stream a response body into a CachedBody, hashing it as it arrives.
+
+        With ``spool`` the body is written to a file in the spool directory
+        rather than held in memory. Raises BodyTooLargeError once the body
+        exceeds max_body_size.
+        """
+        sink = BodySink(self.config.max_body_size, self.spool_dir if spool else None)
+        started = time.perf_counter()
+        try:
+            sink.check_length(response.headers.get('Content-Length'))
+            for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+                sink.feed(chunk)
+        except BaseException:
+            sink.abort()
+            raise
+        finally:
+            self.transport.record_response_bytes(response, sink.size)
+            response.close()
+        self.metrics.observe('download', time.perf_counter() - started)
+        self.metrics.observe_bytes('response_bytes', sink.size)
+        return sink.finish(CachedBody(
+            url=url,
+            etag=response.headers.get('ETag'),
+            last_modified=response.headers.get('Last-Modified'),
+            final_url=response.url,
+            encoding=charset_from_headers(response.headers)
+        ))
+
+    def fetch_page(self, url: str, spool: bool = False) -> Optional[CachedBody]:
+        """Return the page body and validators, or None if it is not modified.
+
+        Reuses the body fetched during sitemap discovery when available,
+        otherwise streams a conditional GET based on the stored validators,
+        spooling the body to disk when ``spool`` is set.
+        """
+        if self.take_not_modified(url):
+            return None
+        cached = self.body_cache.pop(url)
+        if cached is not None:
+            return cached
+
+        response = self.make_request(url, headers=self.conditional_headers(url), stream=True)
+        if response.status_code == 304:
+            response.close()
+            return None
+        return self.read_body(url, response, spool)
+
+    def skip_redirect_duplicate(self, page: CachedBody) -> bool:
+        """Skip a page that redirected to another page of this run."""
+        if not page.final_url or self.follow_redirect(page.url, page.final_url, self.processed_urls) is not None:
+            return False
+        # Record it so the run checkpoint doesn't keep it pending
+        self.record_page_state(page.url, page.digest or self.calculate_hash(page.content), page.etag, page.last_modified)
+        page.discard()
+        self.display.update_stats(processed=1, skipped=1)
+        return True
+
     def process_page(self, url: str, store_raw_html: bool, store_markdown: bool, store_text: bool, store_flatten:bool) -> None:
         """Download, convert, and save a single page with change detection."""
+        started = time.perf_counter()
+        page = None
         try:
-            response = self.make_request(url)
-            
-            current_hash = self.calculate_hash(response.text)
-            
-            if url in self.page_states and self.page_states[url] == current_hash:
-                logger.info(f"Skipping {url}: No changes detected")
-                self.display.update_stats(processed=1)
+            # Pages that are only stored raw never need to be held in memory
+            spool = (store_raw_html or store_text) and not store_markdown
+            page = self.fetch_page(url, spool)
+            if page is None:
+                self.skip_not_modified(url)
                 return
-            
-            urlpath = urlparse(url).path.strip('/')
-
-            # Save markdown content if needed
-            if store_markdown:
-                markdown_content = self.converter.convert(response.text)
-                filepath = self._create_filepath(urlpath, store_flatten, '.md')
-                filepath.parent.mkdir(parents=True, exist_ok=True)
-                filepath.write_text(markdown_content, encoding='utf-8')
-            
-            # Save raw HTML content if needed
-            if store_raw_html:
-                filepath = self._create_filepath(urlpath, store_flatten, '.html')
-                filepath.parent.mkdir(parents=True, exist_ok=True)
-                filepath.write_text(response.text, encoding='utf-8')
-            
-            # Save as plain text file if needed
-            if store_text:
-                filepath = self._create_filepath(urlpath, store_flatten, '.txt')
-                filepath.parent.mkdir(parents=True, exist_ok=True)
-                filepath.write_text(response.text, encoding='utf-8')
-                
-            
-            self.page_states[url] = current_hash
-            self.display.update_stats(processed=1)
+            if self.skip_redirect_duplicate(page):
+                return
+            self.save_page(page, store_raw_html, store_markdown, store_text, store_flatten)
+            self.metrics.observe('page', time.perf_counter() - started)
         
         except Exception as e:
             self.display.update_stats(errors=1)
             logger.error(f"Error processing {url}: {e}")
+        finally:
+            if page is not None:
+                page.discard()
+
+    def save_page(self, page: CachedBody, store_raw_html: bool, store_markdown: bool, store_text: bool, store_flatten: bool) -> None:
+        """Convert and save fetched page content unless it is unchanged."""
+        url = page.url
+        current_hash = page.digest or self.calculate_hash(page.content)
+        
+        previous = self.state_store.get(self.state_key(url)) or {}
+        # Offline runs exist to redo the conversion, so unchanged pages are written again
+        if previous.get('hash') == current_hash and not self.config.offline:
+            logger.info(f"Skipping {url}: No changes detected")
+            # Refresh validators so the next run can use a conditional GET
+            self.record_page_state(url, current_hash, page.etag, page.last_modified)
+            self.display.update_stats(processed=1)
+            return
+        
+        urlpath = urlparse(url).path.strip('/')
+        # Only decoded when it is converted
+        html = page.text if store_markdown else None
+        
+        # Raw HTML and plain text are the body as served and share its hash, so a dedup store keeps one copy
+        suffixes = [suffix for suffix, wanted in (('.html', store_raw_html), ('.txt', store_text)) if wanted]
+        if suffixes:
+            meta = {'url': url, 'title': self.sitemap.get(url, url)}
+            if page.encoding not in (None, 'utf-8'):
+                meta['encoding'] = page.encoding
+            with self.metrics.time('write'):
+                for suffix in suffixes:
+                    filepath = self._create_filepath(urlpath, store_flatten, suffix)
+                    if page.path is None:
+                        self.output_store.write(filepath, page.content, current_hash, meta)
+                    else:
+                        # The last output takes the spooled file itself
+                        self.output_store.write_file(filepath, page.path, current_hash, meta, move=suffix == suffixes[-1])
+                page.path = None
+
+        # Save markdown content if needed, handing it to the conversion pool when enabled
+        if store_markdown:
+            filepath = self._create_filepath(urlpath, store_flatten, '.md')
+            digest = self.markdown_digests.get(current_hash)
+            if digest is not None and self.output_store.link_existing(filepath, digest, {'url': url, 'title': self.sitemap.get(url, url)}):
+                # Identical body already converted during this crawl
+                logger.debug(f"Reusing markdown for {url}: identical content already converted")
+            elif self.conversion_pool is not None:
+                self.conversion_pool.submit(
+                    html, url, filepath,
+                    lambda future: self._conversion_done(future, page, current_hash, filepath)
+                )
+                return
+            else:
+                converted = self.converter.convert_page(html, url, self.config.html_parser, self.content_selectors)
+                self.record_conversion(url, converted)
+                with self.metrics.time('write'):
+                    digest = self.output_store.write(
+                        filepath, converted.markdown.encode('utf-8'), meta={'url': url, 'title': converted.title}
+                    )
+                self.markdown_digests[current_hash] = digest
+        
+        self.record_page_state(url, current_hash, page.etag, page.last_modified)
+        self.display.update_stats(processed=1)
+
+    def _conversion_done(self, future: concurrent.futures.Future, page: CachedBody, current_hash: str, filepath: Path) -> None:
+        """Record the outcome of a page converted in the conversion pool."""
+        error = future.exception()
+        if error is not None:
+            self.display.update_stats(errors=1)
+            logger.error(f"Error converting {page.url}: {error}")
+            return
+        
+        converted = future.result()
+        self.record_conversion(page.url, converted)
+        if not converted.markdown_hash:
+            with self.metrics.time('write'):
+                converted.markdown_hash = self.output_store.write(
+                    filepath, converted.markdown.encode('utf-8'), meta={'url': page.url, 'title': converted.title}
+                )
+        self.markdown_digests[current_hash] = converted.markdown_hash
+        if converted.output_stats:
+            self.output_store.merge_stats(converted.output_stats)
+        self.record_page_state(page.url, current_hash, page.etag, page.last_modified)
+        self.display.update_stats(processed=1)
+
+    def record_conversion(self, url: str, converted: ConvertedPage) -> None:
+        """Log per-page conversion timing and accumulate conversion totals."""
+        if url in self.sitemap and converted.title:
+            self.sitemap[url] = converted.title
+        logger.debug(
+            f"Converted {url}: parse {converted.parse_time * 1000:.1f} ms, "
+            f"convert {converted.convert_time * 1000:.1f} ms, "
+            f"{converted.input_bytes / 1024:.1f} KB -> {converted.output_bytes / 1024:.1f} KB"
+        )
+        self.metrics.observe('parse', converted.parse_time)
+        self.metrics.observe('convert', converted.convert_time)
+        if converted.write_time:
+            self.metrics.observe('write', converted.write_time)
+        self.display.update_stats(
+            parse_time=converted.parse_time,
+            convert_time=converted.convert_time,
+            html_bytes=converted.input_bytes,
+            markdown_bytes=converted.output_bytes
+        )
 
     def parallel_page_processing(self, selected_urls: List[str], store_raw_html: bool, store_markdown: bool, store_text: bool, store_flatten: bool) -> None:
         """Process selected pages in parallel with unified display and change detection."""
-        with concurrent.futures.ThreadPoolExecutor(max_workers=self.config.max_workers) as executor:
+        with self.worker_pool() as executor:
           with self.display.create_progress_bar(len(selected_urls)) as pbar:
             future_to_url = {
               executor.submit(self.process_page, url, store_raw_html, store_markdown, store_text, store_flatten): url
@@ -369,20 +883,106 @@ class DocCrawler:
               except Exception as e:
                 self.display.update_stats(errors=1)
                 logger.error(f"Error processing page: {e}")
+        self.finish_page_processing()
+
+    def finish_page_processing(self) -> None:
+        """Wait for queued conversions, then persist state and release caches."""
+        if self.conversion_pool is not None:
+            self.conversion_pool.shutdown()
+        self.state_store.end_run()
         self.save_state()
+        self.body_cache.clear()
+        shutil.rmtree(self.spool_dir, ignore_errors=True)
+        self.log_transport_stats()
+        logger.info(f"Not modified (304): {self.display.stats['not_modified']:,}")
+        self.output_store.close()
+        output = self.output_store.stats
+        logger.info(f"Output files: {output['files']:,} | Bytes written: {output['bytes']:,}")
+        if 'shards' in output:
+            logger.info(f"Shards written: {output['shards']:,} (index: {self.output_store.output_dir / 'index.jsonl'})")
+        if 'duplicates' in output:
+            logger.info(f"Duplicates linked: {output['duplicates']:,} | Bytes saved: {output['bytes_saved']:,}")
+        if self.redirects:
+            logger.info(f"Redirects followed: {len(self.redirects):,}")
+        stats = self.display.stats
+        if stats.get('convert_time'):
+            logger.info(
+                f"Conversion: parse {stats['parse_time']:.2f}s | "
+                f"convert {stats['convert_time']:.2f}s | "
+                f"{stats['html_bytes'] / 1048576:.1f} MB HTML -> {stats['markdown_bytes'] / 1048576:.1f} MB markdown"
+            )
+        self.export_metrics()
+
+    def export_metrics(self) -> None:
+        """Log the per-stage latency summary and write the metrics files."""
+        self.metrics.log_summary()
+        stats = self.display.stats
+        counters = {name: stats[name] for name in ('processed', 'errors', 'not_modified', 'skipped')}
+        counters.update(
+            (f'http_{name}', value) for name, value in self.transport.stats().items()
+            if name in ('requests', 'connections', 'throttled', 'wire_bytes', 'decoded_bytes')
+        )
+        if self.http_cache is not None:
+            counters.update((f'http_cache_{name}', value) for name, value in self.http_cache.stats.items())
+        counters['output_bytes'] = self.output_store.stats['bytes']
+        try:
+            if self.config.metrics_file:
+                self.metrics.write_json(self.config.metrics_file, counters)
+                logger.info(f"Metrics summary written to {self.config.metrics_file}")
+            if self.config.prometheus_file:
+                self.metrics.write_prometheus(self.config.prometheus_file, counters)
+        except OSError as e:
+            logger.error(f"Could not write metrics: {e}")
+
+    def log_transport_stats(self) -> None:
+        """Log connection reuse counters for the shared transport."""
+        stats = self.transport.stats()
+        logger.info(
+            f"HTTP requests: {stats['requests']:,} | "
+            f"Connections opened: {stats['connections']:,} | "
+            f"Reused: {stats['reused']:,}"
+        )
+        if stats['decoded_bytes']:
+            logger.info(
+                f"Bytes on the wire: {stats['wire_bytes']:,} | Decoded: {stats['decoded_bytes']:,} "
+                f"({stats['decoded_bytes'] / max(stats['wire_bytes'], 1):.1f}x)"
+            )
+        if self.http_cache is not None:
+            cache = self.http_cache.stats
+            logger.info(
+                f"HTTP cache: {cache['hits']:,} hits | {cache['revalidated']:,} revalidated | "
+                f"{cache['misses']:,} misses | {cache['stored']:,} stored | {cache['evicted']:,} evicted | "
+                f"{cache['bytes_served']:,} bytes served"
+            )
+        retries = self.circuit_breaker.stats
+        logger.info(
+            f"Retries: {retries['retries']:,} | "
+            f"Retry budget exhausted: {retries['budget_exhausted']:,} | "
+            f"Circuit opened: {retries['circuit_opened']:,}"
+        )
+        if 'concurrency_limit' in stats:
+            logger.info(
+                f"Concurrency limit: {stats['concurrency_limit']} | "
+                f"Throttled responses: {stats['throttled']:,}"
+            )
 
     def process_selected_pages(self, selected_urls: List[str], store_raw_html: bool, store_markdown: bool, store_text: bool, store_flatten: bool) -> None:
       """Download, convert, and save selected pages using parallel processing."""
       # Reset the display stats and progress
-      self.display.stats['processed'] = 0
-      self.display.stats['relevant'] = 0
-      self.display.stats['errors'] = 0
+      self.display.reset_stats('processed', 'relevant', 'errors', 'not_modified', 'skipped')
+      # Each logical page is fetched once, however it was spelled in the selection
+      selected_urls = self.url_processor.unique_urls(self.redirects.get(url, url) for url in selected_urls)
+      self.processed_urls = {self.url_processor.canonicalize(url) for url in selected_urls}
+      self.state_store.begin_run((self.state_key(url), url) for url in selected_urls)
+      if self.conversion_pool is not None:
+          # Before the fetch workers start, rather than lazily from one of them
+          self.conversion_pool.start()
       self.parallel_page_processing(selected_urls, store_raw_html, store_markdown, store_text, store_flatten)
 
     def store_urls(self, selected_urls: List[str]) -> None:
         """Store captured URLs in a text file."""
-        output_dir = Path('selected_urls')
-        output_dir.mkdir(exist_ok=True)
+        output_dir = self.url_list_dir
+        output_dir.mkdir(parents=True, exist_ok=True)
         if not selected_urls:
             return
         first_url = selected_urls[0]
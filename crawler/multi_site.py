@@ -0,0 +1,145 @@
+import concurrent.futures
+import dataclasses
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Type, TypeVar
+from urllib.parse import urlparse
+
+from utils.config import CrawlerConfig
+from utils.scheduler import FairScheduler
+from crawler.crawler import DocCrawler
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on the default number of shared workers
+MAX_SHARED_WORKERS = 64
+
+T = TypeVar('T')
+
+def site_slug(host: str) -> str:
+    """File-system safe name for a host, e.g. for its output directory."""
+    return host.replace(':', '_')
+
+def _site_file(path: str, slug: str) -> str:
+    if not path:
+        return path
+    path = Path(path)
+    return str(path.with_name(f'{path.stem}.{slug}{path.suffix}'))
+
+def site_config(config: CrawlerConfig, host: str, base_url: str) -> CrawlerConfig:
+    """Derive one site's configuration from the shared one.
+
+    Outputs, state, caches and metrics go to per-host paths so sites never
+    overwrite each other, and the progress bar is off because several sites
+    run at once.
+    """
+    slug = site_slug(host)
+    return dataclasses.replace(
+        config,
+        base_url=base_url,
+        quiet=True,
+        output_dir=str(Path(config.output_dir) / slug),
+        state_file=_site_file(config.state_file, slug),
+        body_cache_dir=str(Path(config.body_cache_dir) / slug),
+        http_cache_dir=str(Path(config.http_cache_dir) / slug),
+        metrics_file=_site_file(config.metrics_file, slug),
+        prometheus_file=_site_file(config.prometheus_file, slug)
+    )
+
+class MultiSiteCrawler:
+    """Crawls several documentation sites in one run.
+
+    Base URLs are grouped by host and each site gets its own crawler, so URL
+    filtering, the rate limiter, adaptive concurrency, retry budget, state
+    and outputs are all per host. The sites run side by side and their fetches
+    share one FairScheduler: each host gets at most max_workers of the
+    shared_workers threads and idle workers go to the hosts round-robin, so
+    the run takes about as long as the slowest site rather than the sum of
+    all of them.
+    """
+
+    def __init__(self, config: CrawlerConfig, base_urls: List[str], crawler_class: Type[DocCrawler] = DocCrawler):
+        groups: Dict[str, List[str]] = {}
+        for url in base_urls:
+            groups.setdefault(urlparse(url).netloc, []).append(url)
+
+        workers = config.shared_workers or min(config.max_workers * len(groups), MAX_SHARED_WORKERS)
+        self.scheduler = FairScheduler(workers, per_host=config.max_workers)
+        self.sites: Dict[str, DocCrawler] = {}
+        for host, urls in groups.items():
+            site = crawler_class(site_config(config, host, urls[0]), urls)
+            site.scheduler = self.scheduler
+            site.url_list_dir = Path('selected_urls') / site_slug(host)
+            self.scheduler.add_host(host, limit=self._limit(site), delay=self._delay(site))
+            self.sites[host] = site
+        logger.info(f"Crawling {len(self.sites)} sites with {workers} shared workers: {', '.join(self.sites)}")
+
+    @staticmethod
+    def _limit(site: DocCrawler) -> Optional[Callable[[], int]]:
+        if site.concurrency is None:
+            return None
+        return lambda: int(site.concurrency.limit)
+
+    @staticmethod
+    def _delay(site: DocCrawler) -> Callable[[], float]:
+        """Seconds until the site may send again: a Retry-After pause or an empty rate bucket."""
+        def delay() -> float:
+            wait = 0.0
+            if site.concurrency is not None:
+                wait = site.concurrency.paused_until - time.monotonic()
+            if site.rate_limiter is not None:
+                wait = max(wait, site.rate_limiter.wait_time())
+            return wait
+        return delay
+
+    def run(self, crawl: Callable[[DocCrawler], T]) -> Dict[str, Optional[T]]:
+        """Run ``crawl`` for every site at once and return its result per host.
+
+        ``crawl`` drives one site through its phases, e.g. parse_sitemap,
+        filter_pages and process_selected_pages. A site whose crawl raises
+        is logged and gets None.
+        """
+        results = {}
+        timings = {}
+
+        def crawl_site(host: str, site: DocCrawler) -> Optional[T]:
+            # Log lines carry the thread name, so name it after the site
+            threading.current_thread().name = site_slug(host)
+            started = time.perf_counter()
+            try:
+                return crawl(site)
+            finally:
+                timings[host] = time.perf_counter() - started
+                logger.info(f"Finished {host} in {timings[host]:.1f}s")
+
+        # One coordinator thread per site; the fetches themselves run on the shared workers
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(self.sites)) as executor:
+            futures = {executor.submit(crawl_site, host, site): host for host, site in self.sites.items()}
+            for future in concurrent.futures.as_completed(futures):
+                host = futures[future]
+                try:
+                    results[host] = future.result()
+                except Exception as e:
+                    results[host] = None
+                    logger.error(f"Error crawling {host}: {e}")
+
+        self.log_summary(timings)
+        return {host: results.get(host) for host in self.sites}
+
+    def log_summary(self, timings: Dict[str, float]) -> None:
+        """Log pages, errors, fetch tasks and elapsed time per site."""
+        tasks = self.scheduler.stats['tasks']
+        peaks = self.scheduler.stats['peak_in_flight']
+        for host, site in self.sites.items():
+            stats = site.display.stats
+            logger.info(
+                f"{host}: {stats['processed']:,} pages | {stats['errors']:,} errors | "
+                f"{tasks.get(host, 0):,} tasks (peak {peaks.get(host, 0)} in flight) | "
+                f"{timings.get(host, 0.0):.1f}s"
+            )
+
+    def close(self) -> None:
+        """Stop the shared workers."""
+        self.scheduler.close()
@@ -4,7 +4,9 @@ from typing import List
 import logging
 from utils.config import CrawlerConfig
 from crawler.crawler import DocCrawler
+from crawler.async_crawler import AsyncDocCrawler
 from utils.logging import setup_logging
+import cli
 
 logger = logging.getLogger(__name__)
 
@@ -34,6 +36,21 @@ def select_language() -> str:
     answers = inquirer.prompt(questions)
     return answers['language'] if answers else 'en'
 
+def resume_interrupted_crawl(crawler: DocCrawler) -> List[str]:
+    """Offer to resume pages left unfinished by an interrupted crawl."""
+    pending = crawler.pending_pages()
+    if not pending:
+        return []
+
+    questions = [
+        inquirer.Confirm('resume',
+                        message=f"Resume interrupted crawl ({len(pending)} pages remaining)?",
+                        default=True)
+    ]
+
+    answers = inquirer.prompt(questions)
+    return pending if answers and answers['resume'] else []
+
 def main():
     """Main execution function."""
     selected_urls = []
@@ -65,6 +82,15 @@ def main():
                             default=False),
             inquirer.Confirm('store_flatten',
                             message="Remove nested folders from output?",
+                            default=False),
+            inquirer.Confirm('lazy_titles',
+                            message="Derive page titles from URLs instead of fetching them?",
+                            default=False),
+            inquirer.Confirm('changed_only',
+                            message="Only crawl pages whose sitemap lastmod changed since the last run?",
+                            default=False),
+            inquirer.Confirm('async_engine',
+                            message="Use the asyncio crawl engine?",
                             default=False)
         ]
         answers = inquirer.prompt(questions)
@@ -77,6 +103,9 @@ def main():
         provide_url_list = answers['provide_url_list'] if answers else False
         multiple_urls = answers['multiple_urls'] if answers else False
         store_flatten = answers['store_flatten'] if answers else False
+        lazy_titles = answers['lazy_titles'] if answers else False
+        changed_only = answers['changed_only'] if answers else False
+        crawler_class = AsyncDocCrawler if answers and answers['async_engine'] else DocCrawler
 
         if not store_raw_html and not store_markdown and not store_text:
             logger.warning("No content will be stored. Exiting...")
@@ -85,7 +114,9 @@ def main():
         
         config = CrawlerConfig(
             base_url="",
-            debug=debug_mode
+            debug=debug_mode,
+            lazy_titles=lazy_titles,
+            changed_only=changed_only
         )
         
         if multiple_urls:
@@ -103,24 +134,26 @@ def main():
             language = select_language()
             config.language = language
             try:
-              crawler = DocCrawler(config, urls)
+              crawler = crawler_class(config, urls)
             except ValueError as e:
               logger.error(e)
               return
                 
-            print("Building sitemap...")
-            crawler.parse_sitemap(urls)
+            selected_urls = resume_interrupted_crawl(crawler)
+            if not selected_urls:
+                print("Building sitemap...")
+                crawler.parse_sitemap(urls)
             
-            if not crawler.sitemap:
-                logger.error("No pages found!")
-                return
+                if not crawler.sitemap:
+                    logger.error("No pages found!")
+                    return
             
-            print(f"\nFound {len(crawler.sitemap)} relevant pages.")
-            selected_urls = crawler.select_pages()
+                print(f"\nFound {len(crawler.sitemap)} relevant pages.")
+                selected_urls = crawler.select_pages()
             
-            if not selected_urls:
-                logger.warning("No pages selected.")
-                return
+                if not selected_urls:
+                    logger.warning("No pages selected.")
+                    return
         
         elif provide_url_list:
             url_file = input("Enter the path to the URL list: ")
@@ -145,28 +178,30 @@ def main():
               config.base_url = urls[0]
             else:
               config.base_url = ""
-            crawler = DocCrawler(config, urls)
+            crawler = crawler_class(config, urls)
 
         else:
             url = input("Enter the base URL to crawl: ")
             language = select_language()
             config.language = language
             config.base_url = url
-            crawler = DocCrawler(config, [url])
+            crawler = crawler_class(config, [url])
 
-            print("Building sitemap...")
-            crawler.parse_sitemap([url])
+            selected_urls = resume_interrupted_crawl(crawler)
+            if not selected_urls:
+                print("Building sitemap...")
+                crawler.parse_sitemap([url])
             
-            if not crawler.sitemap:
-                logger.error("No pages found!")
-                return
+                if not crawler.sitemap:
+                    logger.error("No pages found!")
+                    return
             
-            print(f"\nFound {len(crawler.sitemap)} relevant pages.")
-            selected_urls = crawler.select_pages()
+                print(f"\nFound {len(crawler.sitemap)} relevant pages.")
+                selected_urls = crawler.select_pages()
             
-            if not selected_urls:
-                logger.warning("No pages selected.")
-                return
+                if not selected_urls:
+                    logger.warning("No pages selected.")
+                    return
         
         if store_urls:
             crawler.store_urls(selected_urls)
@@ -182,4 +217,7 @@ def main():
         sys.exit(1)
 
 if __name__ == "__main__":
+    # Any command line arguments select the headless mode
+    if len(sys.argv) > 1:
+        sys.exit(cli.main())
     main()
\ No newline at end of file
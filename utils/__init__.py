@@ -3,5 +3,7 @@ from .validator import validate_url, validate_path
 from .display import UnifiedDisplay
 from .config import CrawlerConfig
 from .url_processor import URLProcessor
+from .transport import HTTPTransport
+from .retry import RetryPolicy
 
-__all__ = ["setup_logging", "validate_url", "validate_path", "UnifiedDisplay", "CrawlerConfig", "URLProcessor"]
\ No newline at end of file
+__all__ = ["setup_logging", "validate_url", "validate_path", "UnifiedDisplay", "CrawlerConfig", "URLProcessor", "HTTPTransport", "RetryPolicy"]
\ No newline at end of file
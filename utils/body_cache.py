@@ -0,0 +1,199 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from threading import Lock
+from typing import Optional
+import codecs
+import hashlib
+import logging
+import re
+import shutil
+import uuid
+
+logger = logging.getLogger(__name__)
+
+CHARSET_PATTERN = re.compile(r'charset\s*=\s*["\']?([\w.:-]+)', re.IGNORECASE)
+
+class BodyTooLargeError(ValueError):
+    """A response body exceeded the configured max_body_size."""
+
+def charset_from_headers(headers) -> Optional[str]:
+    """Return the charset declared in Content-Type, if it names a known codec.
+
+    Unlike requests, no ISO-8859-1 default is assumed for text/html; bodies
+    without a declared charset are decoded as UTF-8.
+    """
+    match = CHARSET_PATTERN.search(headers.get('Content-Type') or '')
+    if not match:
+        return None
+    try:
+        return codecs.lookup(match.group(1)).name
+    except LookupError:
+        return None
+
+@dataclass
+class CachedBody:
+    """A fetched page body: the raw bytes as served, or the file they were spooled to."""
+    url: str
+    content: bytes = b''
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    final_url: Optional[str] = None
+    encoding: Optional[str] = None
+    digest: str = ''
+    path: Optional[Path] = None
+
+    @property
+    def size(self) -> int:
+        return len(self.content)
+
+    @property
+    def text(self) -> str:
+        """The body decoded with its declared charset (UTF-8 by default)."""
+        content = self.content if self.path is None else self.path.read_bytes()
+        return content.decode(self.encoding or 'utf-8', errors='replace')
+
+    def discard(self) -> None:
+        """Remove the spool file of a body that will not be stored."""
+        if self.path is not None:
+            self.path.unlink(missing_ok=True)
+            self.path = None
+
+class BodySink:
+    """Collects a streamed response body.
+
+    Each chunk is hashed as it arrives, so the SHA-256 of the raw bytes is
+    known without another pass, and the body is either kept in memory or
+    written straight to a spool file under ``spool_dir``. Raises
+    BodyTooLargeError once more than ``max_bytes`` arrive (0 for no limit).
+    """
+
+    def __init__(self, max_bytes: int = 0, spool_dir: Optional[Path] = None):
+        self.max_bytes = max_bytes
+        self.hash = hashlib.sha256()
+        self.size = 0
+        self.chunks = []
+        self.path = None
+        self.file = None
+        if spool_dir is not None:
+            spool_dir.mkdir(parents=True, exist_ok=True)
+            self.path = spool_dir / uuid.uuid4().hex
+            self.file = open(self.path, 'wb')
+
+    def check_length(self, content_length: Optional[str]) -> None:
+        """Fail before reading when the declared length is already over the limit."""
+        if self.max_bytes and content_length and content_length.isdigit() and int(content_length) > self.max_bytes:
+            self.abort()
+            raise BodyTooLargeError(f"Content-Length {int(content_length):,} exceeds max_body_size {self.max_bytes:,}")
+
+    def feed(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        if self.max_bytes and self.size > self.max_bytes:
+            self.abort()
+            raise BodyTooLargeError(f"Body exceeds max_body_size {self.max_bytes:,}")
+        self.hash.update(chunk)
+        if self.file is not None:
+            self.file.write(chunk)
+        else:
+            self.chunks.append(chunk)
+
+    def abort(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+            self.path.unlink(missing_ok=True)
+        self.chunks = []
+
+    def finish(self, page: CachedBody) -> CachedBody:
+        """Attach the collected body and its digest to ``page``."""
+        page.digest = self.hash.hexdigest()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+            page.path = self.path
+        else:
+            page.content = b''.join(self.chunks)
+            self.chunks = []
+        return page
+
+class BodyCache:
+    """Bounded page body cache that spills least recently used entries to disk."""
+
+    def __init__(self, max_memory_bytes: int, spill_dir: str):
+        self.max_memory_bytes = max_memory_bytes
+        self.spill_dir = Path(spill_dir)
+        self.memory = OrderedDict()
+        self.spilled = {}
+        self.memory_bytes = 0
+        self.lock = Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'spilled': 0}
+
+    def _spill_path(self, url: str) -> Path:
+        return self.spill_dir / hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def put(self, entry: CachedBody) -> None:
+        """Store a body, spilling older entries to disk when over budget."""
+        with self.lock:
+            self._discard(entry.url)
+            self.memory[entry.url] = entry
+            self.memory_bytes += entry.size
+
+            while self.memory_bytes > self.max_memory_bytes and self.memory:
+                _, oldest = self.memory.popitem(last=False)
+                self.memory_bytes -= oldest.size
+                self._spill(oldest)
+
+    def _spill(self, entry: CachedBody) -> None:
+        try:
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+            path = self._spill_path(entry.url)
+            path.write_bytes(entry.content)
+            # Keep only the metadata in memory
+            entry.content = b''
+            self.spilled[entry.url] = (path, entry)
+            self.stats['spilled'] += 1
+        except OSError as e:
+            logger.debug(f"Could not spill body for {entry.url}: {e}")
+
+    def _discard(self, url: str) -> None:
+        entry = self.memory.pop(url, None)
+        if entry is not None:
+            self.memory_bytes -= entry.size
+        spilled = self.spilled.pop(url, None)
+        if spilled is not None:
+            spilled[0].unlink(missing_ok=True)
+
+    def pop(self, url: str, etag: Optional[str] = None, last_modified: Optional[str] = None) -> Optional[CachedBody]:
+        """Remove and return the cached body for a URL.
+
+        When validators are supplied the entry is only returned if they match.
+        """
+        with self.lock:
+            entry = self.memory.pop(url, None)
+            if entry is not None:
+                self.memory_bytes -= entry.size
+            else:
+                spilled = self.spilled.pop(url, None)
+                if spilled is not None:
+                    path, entry = spilled
+                    try:
+                        entry.content = path.read_bytes()
+                    except OSError as e:
+                        entry = None
+                        logger.debug(f"Could not read spilled body for {url}: {e}")
+                    path.unlink(missing_ok=True)
+
+            if entry is None or (etag and entry.etag != etag) or (last_modified and entry.last_modified != last_modified):
+                self.stats['misses'] += 1
+                return None
+
+            self.stats['hits'] += 1
+            return entry
+
+    def clear(self) -> None:
+        """Drop every cached body and remove spilled files."""
+        with self.lock:
+            self.memory.clear()
+            self.spilled.clear()
+            self.memory_bytes = 0
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
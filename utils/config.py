@@ -1,4 +1,7 @@
 from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from utils.retry import RetryPolicy
 
 @dataclass
 class CrawlerConfig:
@@ -6,12 +9,48 @@ class CrawlerConfig:
     base_url: str
     language: str = 'en'
     max_workers: int = 10
+    shared_workers: int = 0
     debug: bool = False
+    quiet: bool = False
+    progress_interval: float = 0.1
     timeout: int = 10
     max_retries: int = 3
     retry_delay: float = 1
+    retry_policy: Optional[RetryPolicy] = None
     chunk_size: int = 10
     user_agent: str = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+    lazy_titles: bool = False
+    html_parser: Optional[str] = None
+    extract_main_content: bool = False
+    content_selectors: Optional[Tuple[str, ...]] = None
+    changed_only: bool = False
+    url_include: Tuple[str, ...] = ()
+    url_exclude: Tuple[str, ...] = ()
+    crawl_mode: str = 'auto'
+    max_depth: int = 5
+    max_crawl_pages: int = 0
+    state_backend: str = 'sqlite'
+    state_file: str = ''
+    conversion_workers: int = 0
+    conversion_queue_size: int = 100
+    async_concurrency: int = 100
+    rate_limit: float = 0
+    rate_burst: int = 10
+    adaptive_concurrency: bool = True
+    body_cache_size: int = 64 * 1024 * 1024
+    body_cache_dir: str = '.crawler_cache/bodies'
+    max_body_size: int = 32 * 1024 * 1024
+    http_cache: bool = False
+    http_cache_dir: str = '.crawler_cache/http'
+    http_cache_size: int = 1024 * 1024 * 1024
+    offline: bool = False
+    output_dir: str = 'downloaded_urls'
+    dedup_outputs: bool = False
+    dedup_link_mode: str = 'hardlink'
+    output_format: str = 'files'
+    shard_size: int = 256 * 1024 * 1024
+    metrics_file: str = ''
+    prometheus_file: str = ''
 
     def __post_init__(self):
         # if not self.base_url.startswith("http"):
@@ -20,17 +59,84 @@ class CrawlerConfig:
         if self.max_workers < 1:
             raise ValueError("max_workers must be at least 1.")
 
+        if self.shared_workers < 0:
+            raise ValueError("shared_workers cannot be negative.")
+
         if self.timeout < 1:
             raise ValueError("timeout must be at least 1.")
 
+        if self.progress_interval < 0:
+            raise ValueError("progress_interval cannot be negative.")
+
         if self.max_retries < 0:
             raise ValueError("max_retries cannot be negative.")
 
         if self.retry_delay < 0:
             raise ValueError("retry_delay cannot be negative.")
 
+        if self.retry_policy is None:
+            self.retry_policy = RetryPolicy(
+                max_attempts=max(self.max_retries, 1),
+                base_delay=self.retry_delay
+            )
+
         if self.chunk_size < 1:
             raise ValueError("chunk_size must be at least 1.")
 
         if not self.user_agent:
-            raise ValueError("user_agent cannot be empty.")
\ No newline at end of file
+            raise ValueError("user_agent cannot be empty.")
+
+        if self.rate_limit < 0:
+            raise ValueError("rate_limit cannot be negative.")
+
+        if self.rate_burst < 1:
+            raise ValueError("rate_burst must be at least 1.")
+
+        if self.async_concurrency < 1:
+            raise ValueError("async_concurrency must be at least 1.")
+
+        if self.state_backend not in ('sqlite', 'json'):
+            raise ValueError("state_backend must be 'sqlite' or 'json'.")
+
+        if not self.state_file:
+            self.state_file = 'crawler_state.db' if self.state_backend == 'sqlite' else 'crawler_state.json'
+
+        if self.conversion_workers < 0:
+            raise ValueError("conversion_workers cannot be negative.")
+
+        if self.conversion_queue_size < 1:
+            raise ValueError("conversion_queue_size must be at least 1.")
+
+        if self.body_cache_size < 0:
+            raise ValueError("body_cache_size cannot be negative.")
+
+        if self.max_body_size < 0:
+            raise ValueError("max_body_size cannot be negative.")
+
+        if self.http_cache_size < 1:
+            raise ValueError("http_cache_size must be at least 1.")
+
+        # Offline runs replay the HTTP cache
+        if self.offline:
+            self.http_cache = True
+
+        if not self.output_dir:
+            raise ValueError("output_dir cannot be empty.")
+
+        if self.dedup_link_mode not in ('hardlink', 'symlink', 'manifest'):
+            raise ValueError("dedup_link_mode must be 'hardlink', 'symlink' or 'manifest'.")
+
+        if self.crawl_mode not in ('auto', 'sitemap', 'links'):
+            raise ValueError("crawl_mode must be 'auto', 'sitemap' or 'links'.")
+
+        if self.max_depth < 0:
+            raise ValueError("max_depth cannot be negative.")
+
+        if self.max_crawl_pages < 0:
+            raise ValueError("max_crawl_pages cannot be negative.")
+
+        if self.output_format not in ('files', 'jsonl', 'tar'):
+            raise ValueError("output_format must be 'files', 'jsonl' or 'tar'.")
+
+        if self.shard_size < 1:
+            raise ValueError("shard_size must be at least 1.")
\ No newline at end of file
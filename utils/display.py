@@ -2,27 +2,44 @@ import time
 import shutil
 import logging
 from queue import Queue
-from threading import Lock
+from threading import Lock, local
+from typing import Dict
 from tqdm import tqdm
 
 logger = logging.getLogger(__name__)
 
+COUNTERS = ('processed', 'relevant', 'errors', 'not_modified', 'skipped')
+
+class StatusProgressBar(tqdm):
+    """tqdm bar that shows the final, exact status line when it closes."""
+
+    def __init__(self, *args, unified_display: 'UnifiedDisplay', **kwargs):
+        self.unified_display = unified_display
+        super().__init__(*args, **kwargs)
+
+    def close(self):
+        if not self.disable and self.unified_display.progress_bar is self:
+            self.set_description(self.unified_display.get_status_line(), refresh=False)
+        super().close()
+
 class UnifiedDisplay:
     """Manages all console output including logs, stats, and progress."""
     
-    def __init__(self, debug: bool = False):
+    def __init__(self, debug: bool = False, quiet: bool = False, update_interval: float = 0.1):
         self.debug = debug
-        self.stats = {
-            'processed': 0,
-            'relevant': 0,
-            'errors': 0,
+        self.quiet = quiet
+        # Counters are kept per thread and summed on read; other values are shared
+        self.values = {
             'current_url': '',
             'start_time': time.time()
         }
+        self.local = local()
+        self.thread_counters = []
+        self.counters_lock = Lock()
         self.lock = Lock()
         self.terminal_width = shutil.get_terminal_size().columns
         self.last_update = 0
-        self.update_interval = 0.1
+        self.update_interval = update_interval
         self.progress_bar = None
         
         self.log_handler = self.create_log_handler()
@@ -69,27 +86,78 @@ class UnifiedDisplay:
             
             self.last_message = message
 
+    def _counters(self) -> Dict[str, float]:
+        counters = getattr(self.local, 'counters', None)
+        if counters is None:
+            counters = {}
+            with self.counters_lock:
+                self.thread_counters.append(counters)
+            self.local.counters = counters
+        return counters
+
     def update_stats(self, **kwargs) -> None:
-        with self.lock:
-            for key, value in kwargs.items():
-                if isinstance(value, (int, float)):
-                    self.stats[key] = self.stats.get(key, 0) + value
-                else:
-                    self.stats[key] = value
-            
-            if self.progress_bar:
+        """Add numeric values to the counters and replace any other values.
+
+        Counters belong to the calling thread, so no lock is taken. The
+        progress bar is redrawn at most once per update_interval, however
+        often this is called.
+        """
+        counters = self._counters()
+        for key, value in kwargs.items():
+            if isinstance(value, (int, float)):
+                counters[key] = counters.get(key, 0) + value
+            else:
+                self.values[key] = value
+        
+        if self.progress_bar is not None and time.monotonic() - self.last_update >= self.update_interval:
+            self.render()
+
+    def render(self) -> None:
+        """Redraw the status line, unless another thread is already doing so."""
+        if not self.lock.acquire(blocking=False):
+            return
+        try:
+            self.last_update = time.monotonic()
+            if self.progress_bar is not None:
                 self.progress_bar.set_description(self.get_status_line())
+        finally:
+            self.lock.release()
+
+    @property
+    def stats(self) -> Dict[str, float]:
+        """Snapshot of the counters summed across threads, plus the shared values."""
+        with self.counters_lock:
+            snapshots = [counters.copy() for counters in self.thread_counters]
+        stats = dict.fromkeys(COUNTERS, 0)
+        stats.update(self.values)
+        for counters in snapshots:
+            for key, value in counters.items():
+                stats[key] = stats.get(key, 0) + value
+        return stats
+
+    def reset_stats(self, *keys: str) -> None:
+        """Zero the given counters; call between phases, not while workers run."""
+        with self.counters_lock:
+            for counters in self.thread_counters:
+                for key in keys:
+                    counters.pop(key, None)
 
     def get_status_line(self) -> str:
-        elapsed = time.time() - self.stats['start_time']
-        rate = self.stats['processed'] / elapsed if elapsed > 0 else 0
-        return (f"Processed: {self.stats['processed']:,} | "
-                f"Relevant: {self.stats['relevant']:,} | "
-                f"Errors: {self.stats['errors']} | "
+        stats = self.stats
+        elapsed = time.time() - stats['start_time']
+        rate = stats['processed'] / elapsed if elapsed > 0 else 0
+        return (f"Processed: {stats['processed']:,} | "
+                f"Relevant: {stats['relevant']:,} | "
+                f"Errors: {stats['errors']} | "
                 f"Rate: {rate:.1f}/s")
 
     def create_progress_bar(self, total: int, desc: str = None) -> tqdm:
-        self.progress_bar = tqdm(
+        """Create the progress bar; in quiet mode it is disabled and never drawn."""
+        if self.quiet:
+            self.progress_bar = None
+            return tqdm(total=total, disable=True)
+        self.progress_bar = StatusProgressBar(
+            unified_display=self,
             total=total,
             desc=desc or self.get_status_line(),
             position=0,
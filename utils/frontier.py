@@ -0,0 +1,33 @@
+from threading import Lock
+import hashlib
+
+class SeenSet:
+    """Compact, thread-safe set of URLs already queued by the link crawl.
+
+    Stores a 64-bit BLAKE2 hash of each URL instead of the string, which
+    keeps memory per URL well under half that of a set of URLs. A collision
+    (about 1 in 10^7 at a million URLs) only means a page is skipped.
+    """
+
+    def __init__(self):
+        self.hashes = set()
+        self.lock = Lock()
+
+    @staticmethod
+    def key(url: str) -> int:
+        return int.from_bytes(hashlib.blake2b(url.encode('utf-8'), digest_size=8).digest(), 'little')
+
+    def __contains__(self, url: str) -> bool:
+        return self.key(url) in self.hashes
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    def add(self, url: str) -> bool:
+        """Add a URL, returning True if it had not been seen before."""
+        key = self.key(url)
+        with self.lock:
+            if key in self.hashes:
+                return False
+            self.hashes.add(key)
+            return True
@@ -0,0 +1,306 @@
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from threading import Lock
+from typing import BinaryIO, Dict, Optional, Tuple
+import hashlib
+import io
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import time
+import uuid
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from utils.body_cache import BodySink, CachedBody
+
+logger = logging.getLogger(__name__)
+
+# Share of the time since Last-Modified a response without explicit expiry stays fresh (RFC 7234 4.2.2)
+HEURISTIC_FRACTION = 0.1
+
+# Not stored: the body is kept decoded and these describe the transfer, not the content
+UNSTORED_HEADERS = frozenset((
+    'connection', 'keep-alive', 'proxy-connection', 'transfer-encoding', 'content-encoding',
+    'content-length', 'set-cookie', 'trailer', 'upgrade'
+))
+
+class OfflineCacheMiss(requests.RequestException):
+    """A request in offline mode for a URL that is not in the HTTP cache."""
+
+def parse_cache_control(value: Optional[str]) -> Dict[str, Optional[str]]:
+    """Split a Cache-Control header into lowercase directives and their values."""
+    directives = {}
+    for part in (value or '').split(','):
+        name, _, argument = part.partition('=')
+        name = name.strip().lower()
+        if name:
+            directives[name] = argument.strip().strip('"') or None
+    return directives
+
+def parse_http_date(value: Optional[str]) -> Optional[float]:
+    """Return an HTTP date as a Unix timestamp, or None if it is missing or invalid."""
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+def _seconds(value: Optional[str]) -> Optional[int]:
+    if value is None or not value.strip().isdigit():
+        return None
+    return int(value)
+
+@dataclass
+class CacheEntry:
+    """Index record of one cached response; the body lives in ``path``."""
+    url: str
+    final_url: str
+    status: int
+    headers: CaseInsensitiveDict
+    size: int
+    stored_at: float
+    path: Path
+
+    def freshness_lifetime(self) -> float:
+        """Seconds the response may be used without revalidation (RFC 7234 4.2.1)."""
+        headers = self.headers
+        cache_control = parse_cache_control(headers.get('Cache-Control'))
+        # A private cache ignores s-maxage
+        max_age = _seconds(cache_control.get('max-age'))
+        if max_age is not None:
+            return max_age
+        date = parse_http_date(headers.get('Date')) or self.stored_at
+        if 'Expires' in headers:
+            # An invalid Expires, such as "0", means already expired
+            expires = parse_http_date(headers['Expires'])
+            return expires - date if expires is not None else 0
+        last_modified = parse_http_date(headers.get('Last-Modified'))
+        if last_modified is not None and last_modified < date:
+            return (date - last_modified) * HEURISTIC_FRACTION
+        return 0
+
+    def current_age(self, now: Optional[float] = None) -> float:
+        """Age of the response, including any Age it arrived with (RFC 7234 4.2.3)."""
+        headers = self.headers
+        date = parse_http_date(headers.get('Date'))
+        apparent_age = max(self.stored_at - date, 0) if date is not None else 0
+        initial_age = max(apparent_age, _seconds(headers.get('Age')) or 0)
+        return initial_age + (now or time.time()) - self.stored_at
+
+    def is_fresh(self, now: Optional[float] = None) -> bool:
+        cache_control = parse_cache_control(self.headers.get('Cache-Control'))
+        if 'no-cache' in cache_control:
+            return False
+        return self.freshness_lifetime() > self.current_age(now)
+
+class _CacheFile(io.FileIO):
+    """A cached body handed to requests as response.raw.
+
+    requests only closes raw when the body was not read, so the file
+    closes itself at EOF.
+    """
+
+    def read(self, size: int = -1) -> bytes:
+        data = super().read(size)
+        if not data:
+            self.close()
+        return data
+
+class HTTPCache:
+    """On-disk HTTP response cache with size-bounded LRU eviction.
+
+    Responses are keyed by the (canonical) request URL. Bodies are stored
+    decoded, one file each, and their headers and access times are indexed
+    in SQLite so the cache persists across crawls. Freshness follows RFC
+    7234: fresh entries are served without a request, stale ones are
+    revalidated with their ETag / Last-Modified. In offline mode every entry
+    is served as is and a miss raises OfflineCacheMiss instead of going to
+    the network.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, offline: bool = False):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.temp_dir = self.directory / 'tmp'
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.lock = Lock()
+        self.connection = sqlite3.connect(str(self.directory / 'index.db'), check_same_thread=False, isolation_level=None)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS entries ('
+            'url TEXT PRIMARY KEY, final_url TEXT, status INTEGER, headers TEXT, '
+            'size INTEGER, stored_at REAL, accessed REAL)'
+        )
+        self.connection.execute('CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)')
+        self.total_bytes = self.connection.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        self.stats = {'hits': 0, 'misses': 0, 'revalidated': 0, 'stored': 0, 'evicted': 0, 'bytes_served': 0}
+        # In case max_bytes was lowered since the last run
+        with self.lock:
+            self._evict(keep='')
+
+    def _path(self, url: str) -> Path:
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return self.directory / key[:2] / key
+
+    def lookup(self, url: str) -> Optional[CacheEntry]:
+        """Return the entry for a URL, marking it as recently used."""
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT final_url, status, headers, size, stored_at FROM entries WHERE url = ?', (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            if not self._path(url).exists():
+                # Body removed from under the index
+                self.connection.execute('DELETE FROM entries WHERE url = ?', (url,))
+                self.total_bytes -= row[3]
+                return None
+            self.connection.execute('UPDATE entries SET accessed = ? WHERE url = ?', (time.time(), url))
+        final_url, status, headers, size, stored_at = row
+        return CacheEntry(url, final_url, status, CaseInsensitiveDict(json.loads(headers)), size, stored_at, self._path(url))
+
+    def prepare(self, url: str, headers: Optional[dict] = None) -> Tuple[Optional[CacheEntry], Optional[dict]]:
+        """Decide how to answer a GET for ``url``.
+
+        Returns ``(entry, None)`` when the cached entry can be served
+        directly, otherwise the entry to revalidate (if any) and the headers
+        to send: the caller's, with the entry's validators taking precedence.
+        """
+        entry = self.lookup(url)
+        if entry is not None and (self.offline or entry.is_fresh()):
+            with self.lock:
+                self.stats['hits'] += 1
+            return entry, None
+        if self.offline:
+            with self.lock:
+                self.stats['misses'] += 1
+            raise OfflineCacheMiss(f"{url} is not in the HTTP cache (offline mode)")
+
+        request_headers = dict(headers or {})
+        if entry is None:
+            with self.lock:
+                self.stats['misses'] += 1
+            return None, request_headers
+        # Conditional headers from the caller describe some other copy of the page
+        request_headers.pop('If-None-Match', None)
+        request_headers.pop('If-Modified-Since', None)
+        if entry.headers.get('ETag'):
+            request_headers['If-None-Match'] = entry.headers['ETag']
+        if entry.headers.get('Last-Modified'):
+            request_headers['If-Modified-Since'] = entry.headers['Last-Modified']
+        return entry, request_headers
+
+    @staticmethod
+    def is_cacheable(status: int, headers) -> bool:
+        """Whether a response to a plain GET may be stored (RFC 7234 3)."""
+        if status != 200:
+            return False
+        if 'no-store' in parse_cache_control(headers.get('Cache-Control')):
+            return False
+        return headers.get('Vary', '').strip() != '*'
+
+    def store(self, url: str, final_url: str, status: int, headers, body: CachedBody) -> Optional[CacheEntry]:
+        """Add a response, replacing any previous entry for the URL.
+
+        The body is moved into the cache when it was spooled to a file
+        under ``temp_dir``, otherwise copied. Least recently used entries
+        are evicted until the cache fits in ``max_bytes`` again.
+        """
+        path = self._path(url)
+        size = body.size if body.path is None else body.path.stat().st_size
+        stored_headers = CaseInsensitiveDict(
+            (name, value) for name, value in headers.items() if name.lower() not in UNSTORED_HEADERS
+        )
+        stored_headers['Content-Length'] = str(size)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            if body.path is not None and body.path.parent == self.temp_dir:
+                os.replace(body.path, path)
+                body.path = None
+            else:
+                # Written aside and renamed so readers never see a partial body
+                self.temp_dir.mkdir(parents=True, exist_ok=True)
+                temp = self.temp_dir / uuid.uuid4().hex
+                if body.path is None:
+                    temp.write_bytes(body.content)
+                else:
+                    shutil.copyfile(body.path, temp)
+                os.replace(temp, path)
+        except OSError as e:
+            logger.warning(f"Could not cache {url}: {e}")
+            return None
+
+        now = time.time()
+        with self.lock:
+            previous = self.connection.execute('SELECT size FROM entries WHERE url = ?', (url,)).fetchone()
+            self.connection.execute(
+                'INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (url, final_url, status, json.dumps(dict(stored_headers)), size, now, now)
+            )
+            self.total_bytes += size - (previous[0] if previous else 0)
+            self.stats['stored'] += 1
+            self._evict(url)
+        return CacheEntry(url, final_url, status, stored_headers, size, now, path)
+
+    def _evict(self, keep: str) -> None:
+        while self.total_bytes > self.max_bytes:
+            rows = self.connection.execute(
+                'SELECT url, size FROM entries WHERE url != ? ORDER BY accessed LIMIT 64', (keep,)
+            ).fetchall()
+            if not rows:
+                return
+            for url, size in rows:
+                self.connection.execute('DELETE FROM entries WHERE url = ?', (url,))
+                self._path(url).unlink(missing_ok=True)
+                self.total_bytes -= size
+                self.stats['evicted'] += 1
+                if self.total_bytes <= self.max_bytes:
+                    return
+
+    def refresh(self, entry: CacheEntry, headers) -> CacheEntry:
+        """Update an entry revalidated by a 304 with the headers it carried (RFC 7234 4.3.4)."""
+        entry.headers.update((name, value) for name, value in headers.items() if name.lower() not in UNSTORED_HEADERS)
+        entry.stored_at = time.time()
+        with self.lock:
+            self.connection.execute(
+                'UPDATE entries SET headers = ?, stored_at = ?, accessed = ? WHERE url = ?',
+                (json.dumps(dict(entry.headers)), entry.stored_at, entry.stored_at, entry.url)
+            )
+            self.stats['revalidated'] += 1
+        return entry
+
+    def open(self, entry: CacheEntry) -> BinaryIO:
+        """Open an entry's body for reading."""
+        with self.lock:
+            self.stats['bytes_served'] += entry.size
+        return _CacheFile(entry.path, 'r')
+
+    def response(self, entry: CacheEntry) -> requests.Response:
+        """Build a requests response that streams an entry's body from disk."""
+        response = requests.Response()
+        response.status_code = entry.status
+        response.reason = 'OK'
+        response.url = entry.final_url
+        response.headers = CaseInsensitiveDict(entry.headers)
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.raw = self.open(entry)
+        response.from_cache = True
+        return response
+
+    def read(self, entry: CacheEntry, sink: BodySink) -> None:
+        """Feed an entry's body to a BodySink in chunks."""
+        with self.open(entry) as f:
+            for chunk in iter(lambda: f.read(64 * 1024), b''):
+                sink.feed(chunk)
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.close()
@@ -0,0 +1,190 @@
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Iterator, Optional
+import json
+import logging
+import math
+import os
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+# Ratio between histogram bucket bounds; quantiles are within about 2%
+BUCKET_GROWTH = 1.04
+LOG_GROWTH = math.log(BUCKET_GROWTH)
+ZERO_BUCKET = -sys.maxsize
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Timed stages, in pipeline order:
+#   queue     waiting for the rate limiter and a concurrency slot
+#   connect   DNS, TCP and TLS for a new connection
+#   ttfb      request sent until the response headers arrive
+#   download  reading the response body
+#   title     parsing a page's <title> during sitemap discovery
+#   parse     building the HTML tree for conversion
+#   convert   markdownify
+#   write     writing output files or shard records
+#   page      one page from fetch until it is saved (or queued for conversion)
+STAGES = ('queue', 'connect', 'ttfb', 'download', 'title', 'parse', 'convert', 'write', 'page')
+
+class Histogram:
+    """Streaming histogram with logarithmic buckets.
+
+    Memory grows with the range of the observed values, not their number, so
+    it can record every request of a long crawl.
+    """
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        index = math.floor(math.log(value) / LOG_GROWTH) if value > 0 else ZERO_BUCKET
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Estimate the q-quantile (0 < q <= 1) of the observed values."""
+        if not self.count:
+            return 0.0
+        rank = max(math.ceil(q * self.count), 1)
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                break
+        if index == ZERO_BUCKET:
+            return 0.0
+        # Geometric middle of the bucket, clamped to the observed range
+        return min(max(BUCKET_GROWTH ** (index + 0.5), self.min), self.max)
+
+    def summary(self) -> Dict[str, float]:
+        summary = {
+            'count': self.count,
+            'sum': self.total,
+            'mean': self.total / self.count if self.count else 0.0,
+            'min': self.min if self.count else 0.0,
+            'max': self.max
+        }
+        for q in QUANTILES:
+            summary[f'p{round(q * 100)}'] = self.quantile(q)
+        return summary
+
+class Metrics:
+    """Thread-safe per-stage timing and size histograms for one crawl."""
+
+    def __init__(self):
+        self.timings = {}
+        self.sizes = {}
+        self.lock = Lock()
+        self.started = time.time()
+
+    def observe(self, stage: str, seconds: float) -> None:
+        """Record the duration of one stage."""
+        with self.lock:
+            histogram = self.timings.get(stage)
+            if histogram is None:
+                histogram = self.timings[stage] = Histogram()
+            histogram.observe(seconds)
+
+    def observe_bytes(self, name: str, size: int) -> None:
+        """Record a size, e.g. the bytes of a downloaded body."""
+        with self.lock:
+            histogram = self.sizes.get(name)
+            if histogram is None:
+                histogram = self.sizes[name] = Histogram()
+            histogram.observe(size)
+
+    @contextmanager
+    def time(self, stage: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def summary(self, counters: Optional[Dict[str, float]] = None) -> dict:
+        """Return the run summary: p50/p95/p99 per stage plus optional counters."""
+        with self.lock:
+            order = {stage: position for position, stage in enumerate(STAGES)}
+            timings = {
+                stage: self.timings[stage].summary()
+                for stage in sorted(self.timings, key=lambda stage: (order.get(stage, len(order)), stage))
+            }
+            sizes = {name: histogram.summary() for name, histogram in sorted(self.sizes.items())}
+        return {
+            'started': datetime.fromtimestamp(self.started, timezone.utc).isoformat(),
+            'duration': time.time() - self.started,
+            'timings': timings,
+            'sizes': sizes,
+            'counters': counters or {}
+        }
+
+    def log_summary(self) -> None:
+        """Log one line of p50/p95/p99 milliseconds per stage."""
+        for stage, stats in self.summary()['timings'].items():
+            logger.info(
+                f"{stage:<8} n={stats['count']:<7,} "
+                f"p50 {stats['p50'] * 1000:8.1f} ms | p95 {stats['p95'] * 1000:8.1f} ms | "
+                f"p99 {stats['p99'] * 1000:8.1f} ms | total {stats['sum']:.2f}s"
+            )
+
+    def write_json(self, path: str, counters: Optional[Dict[str, float]] = None) -> None:
+        """Write the run summary as JSON."""
+        _write_atomic(path, json.dumps(self.summary(counters), indent=2) + '\n')
+
+    def write_prometheus(self, path: str, counters: Optional[Dict[str, float]] = None) -> None:
+        """Write the metrics in the Prometheus text format.
+
+        Suitable for node_exporter's textfile collector: the file is replaced
+        atomically so a scrape never sees a partial write.
+        """
+        summary = self.summary(counters)
+        lines = [
+            '# HELP crawler_stage_seconds Time spent per crawl stage.',
+            '# TYPE crawler_stage_seconds summary'
+        ]
+        for stage, stats in summary['timings'].items():
+            lines.extend(_summary_lines('crawler_stage_seconds', f'stage="{stage}"', stats))
+        for name, stats in summary['sizes'].items():
+            metric = f'crawler_{name}'
+            lines.append(f'# TYPE {metric} summary')
+            lines.extend(_summary_lines(metric, '', stats))
+        for name, value in summary['counters'].items():
+            metric = f'crawler_{name}_total'
+            lines.append(f'# TYPE {metric} counter')
+            lines.append(f'{metric} {value}')
+        lines.append('# TYPE crawler_run_duration_seconds gauge')
+        lines.append(f"crawler_run_duration_seconds {summary['duration']:.3f}")
+        lines.append('# TYPE crawler_run_timestamp_seconds gauge')
+        lines.append(f'crawler_run_timestamp_seconds {self.started:.0f}')
+        _write_atomic(path, '\n'.join(lines) + '\n')
+
+def _summary_lines(metric: str, labels: str, stats: Dict[str, float]) -> list:
+    separator = ',' if labels else ''
+    lines = [
+        f'{metric}{{{labels}{separator}quantile="{q}"}} {stats[f"p{round(q * 100)}"]:.6g}'
+        for q in QUANTILES
+    ]
+    suffix = f'{{{labels}}}' if labels else ''
+    lines.append(f"{metric}_sum{suffix} {stats['sum']:.6g}")
+    lines.append(f"{metric}_count{suffix} {stats['count']}")
+    return lines
+
+def _write_atomic(path: str, text: str) -> None:
+    target = Path(path)
+    if target.parent != Path('.'):
+        target.parent.mkdir(parents=True, exist_ok=True)
+    temp = target.with_name(f'.{target.name}.{os.getpid()}.tmp')
+    temp.write_text(text, encoding='utf-8')
+    os.replace(temp, target)
@@ -0,0 +1,395 @@
+from datetime import datetime, timezone
+from pathlib import Path
+from threading import Lock, Thread
+from typing import Dict, Optional
+import gzip
+import hashlib
+import io
+import json
+import logging
+import os
+import queue
+import shutil
+import tarfile
+import uuid
+
+logger = logging.getLogger(__name__)
+
+def _place(source: Path, target: Path, move: bool) -> None:
+    if not move:
+        shutil.copyfile(source, target)
+        return
+    try:
+        os.replace(source, target)
+    except OSError:
+        # e.g. across filesystems
+        shutil.move(source, target)
+
+class OutputStore:
+    """Writes converted pages to disk, one file per URL and output type."""
+
+    # Whether a pickled copy can write from a conversion worker process
+    process_safe = True
+
+    def __init__(self, output_dir: str = 'downloaded_urls'):
+        self.output_dir = Path(output_dir)
+        self.created_dirs = set()
+        self.lock = Lock()
+        self.stats = {'files': 0, 'bytes': 0}
+
+    def __getstate__(self):
+        # Stores are shipped to conversion worker processes; locks can't be pickled and
+        # the copy counts only its own writes so they can be merged back
+        state = self.__dict__.copy()
+        del state['lock']
+        state['created_dirs'] = set()
+        state['stats'] = dict.fromkeys(self.stats, 0)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = Lock()
+
+    def _ensure_dir(self, directory: Path) -> None:
+        # mkdir once per directory rather than once per write
+        if directory in self.created_dirs:
+            return
+        directory.mkdir(parents=True, exist_ok=True)
+        self.created_dirs.add(directory)
+
+    def _count(self, size: int) -> None:
+        with self.lock:
+            self.stats['files'] += 1
+            self.stats['bytes'] += size
+
+    def merge_stats(self, stats: Dict[str, int]) -> None:
+        """Add counters reported by a copy of this store in a worker process."""
+        with self.lock:
+            for key, value in stats.items():
+                self.stats[key] = self.stats.get(key, 0) + value
+
+    def write(self, filepath: Path, data: bytes, digest: Optional[str] = None,
+              meta: Optional[Dict[str, str]] = None) -> str:
+        """Write one output file, returning the SHA-256 of its content.
+
+        ``meta`` carries the page url and title for stores that record them.
+        """
+        self._ensure_dir(filepath.parent)
+        filepath.write_bytes(data)
+        self._count(len(data))
+        return digest or hashlib.sha256(data).hexdigest()
+
+    def write_file(self, filepath: Path, source: Path, digest: str,
+                   meta: Optional[Dict[str, str]] = None, move: bool = False) -> str:
+        """Store content that is already on disk, such as a spooled download.
+
+        The source is renamed into place with ``move`` and copied otherwise,
+        so the content is never read into memory.
+        """
+        self._ensure_dir(filepath.parent)
+        _place(source, filepath, move)
+        self._count(filepath.stat().st_size)
+        return digest
+
+    def link_existing(self, filepath: Path, digest: str, meta: Optional[Dict[str, str]] = None) -> bool:
+        """Materialise previously written content by digest, if supported."""
+        return False
+
+    def close(self) -> None:
+        """Flush any buffered output."""
+
+class DedupOutputStore(OutputStore):
+    """Content-addressed output store that keeps each unique body once.
+
+    Bodies live under ``<output_dir>/.blobs`` keyed by their SHA-256. Per-URL
+    paths are materialised as hardlinks or symlinks to the blob, or only
+    recorded in ``manifest.jsonl`` when link_mode is 'manifest'.
+    """
+
+    LINK_MODES = ('hardlink', 'symlink', 'manifest')
+
+    def __init__(self, output_dir: str = 'downloaded_urls', link_mode: str = 'hardlink'):
+        super().__init__(output_dir)
+        if link_mode not in self.LINK_MODES:
+            raise ValueError(f"link_mode must be one of {', '.join(self.LINK_MODES)}.")
+        self.link_mode = link_mode
+        self.blob_dir = self.output_dir / '.blobs'
+        self.manifest_path = self.output_dir / 'manifest.jsonl'
+        self.stats.update({'blobs': 0, 'duplicates': 0, 'bytes_saved': 0})
+
+    def _blob_path(self, digest: str, suffix: str) -> Path:
+        return self.blob_dir / digest[:2] / f"{digest}{suffix}"
+
+    def write(self, filepath: Path, data: bytes, digest: Optional[str] = None,
+              meta: Optional[Dict[str, str]] = None) -> str:
+        digest = digest or hashlib.sha256(data).hexdigest()
+        blob = self._blob_path(digest, filepath.suffix)
+        if blob.exists():
+            with self.lock:
+                self.stats['duplicates'] += 1
+                self.stats['bytes_saved'] += len(data)
+        else:
+            self._ensure_dir(blob.parent)
+            # Write then rename so concurrent writers never see a partial blob
+            temp = blob.with_name(f".{blob.name}.{uuid.uuid4().hex}")
+            temp.write_bytes(data)
+            os.replace(temp, blob)
+            with self.lock:
+                self.stats['blobs'] += 1
+                self.stats['bytes'] += len(data)
+        self._materialise(filepath, blob)
+        return digest
+
+    def write_file(self, filepath: Path, source: Path, digest: str,
+                   meta: Optional[Dict[str, str]] = None, move: bool = False) -> str:
+        blob = self._blob_path(digest, filepath.suffix)
+        size = source.stat().st_size
+        if blob.exists():
+            with self.lock:
+                self.stats['duplicates'] += 1
+                self.stats['bytes_saved'] += size
+            if move:
+                source.unlink()
+        else:
+            self._ensure_dir(blob.parent)
+            temp = blob.with_name(f".{blob.name}.{uuid.uuid4().hex}")
+            _place(source, temp, move)
+            os.replace(temp, blob)
+            with self.lock:
+                self.stats['blobs'] += 1
+                self.stats['bytes'] += size
+        self._materialise(filepath, blob)
+        return digest
+
+    def link_existing(self, filepath: Path, digest: str, meta: Optional[Dict[str, str]] = None) -> bool:
+        blob = self._blob_path(digest, filepath.suffix)
+        if not blob.exists():
+            return False
+        with self.lock:
+            self.stats['duplicates'] += 1
+            self.stats['bytes_saved'] += blob.stat().st_size
+        self._materialise(filepath, blob)
+        return True
+
+    def _materialise(self, filepath: Path, blob: Path) -> None:
+        with self.lock:
+            self.stats['files'] += 1
+
+        if self.link_mode == 'manifest':
+            record = json.dumps({'path': str(filepath), 'blob': str(blob.relative_to(self.output_dir))}) + '\n'
+            self._ensure_dir(self.output_dir)
+            # O_APPEND keeps single-line writes atomic across threads and worker processes
+            fd = os.open(self.manifest_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            try:
+                os.write(fd, record.encode('utf-8'))
+            finally:
+                os.close(fd)
+            return
+
+        self._ensure_dir(filepath.parent)
+        if filepath.is_symlink() or filepath.exists():
+            filepath.unlink()
+        try:
+            if self.link_mode == 'hardlink':
+                os.link(blob, filepath)
+            else:
+                filepath.symlink_to(os.path.relpath(blob, filepath.parent))
+        except OSError as e:
+            logger.debug(f"Could not link {filepath} to {blob}, copying instead: {e}")
+            shutil.copyfile(blob, filepath)
+
+# Record field holding the content of each output type
+CONTENT_FIELDS = {'.md': 'markdown', '.html': 'html', '.txt': 'text'}
+
+class ShardOutputStore(OutputStore):
+    """Streams pages into size-bounded archive shards instead of one file per URL.
+
+    ``jsonl`` shards hold one JSON record per output (url, title, hash,
+    fetched_at and the content), each gzip-compressed as its own member so a
+    record can be read back by offset. ``tar`` shards are plain tar archives.
+    Every record gets a line in ``index.jsonl`` with its shard, offset and
+    length. A single writer thread owns the shard files, so fetch workers only
+    hand records to a bounded queue.
+    """
+
+    FORMATS = ('jsonl', 'tar')
+    process_safe = False
+
+    def __init__(self, output_dir: str = 'downloaded_urls', output_format: str = 'jsonl',
+                 shard_size: int = 256 * 1024 * 1024, dedup: bool = False, queue_size: int = 1000):
+        super().__init__(output_dir)
+        if output_format not in self.FORMATS:
+            raise ValueError(f"output_format must be one of {', '.join(self.FORMATS)}.")
+        self.output_format = output_format
+        self.shard_size = shard_size
+        self.dedup = dedup
+        self.locations = {}
+        self.records = queue.Queue(maxsize=queue_size)
+        self.shard = None
+        self.archive = None
+        # Shards of earlier runs stay listed in the appended index, so numbering continues after them
+        self.shard_index = self._last_shard_index()
+        self.index = None
+        self.error = None
+        self.stats.update({'shards': 0})
+        if dedup:
+            self.stats.update({'duplicates': 0, 'bytes_saved': 0})
+        self.writer = Thread(target=self._run, name='shard-writer', daemon=True)
+        self.writer.start()
+
+    def __getstate__(self):
+        raise TypeError("ShardOutputStore is owned by its writer thread and cannot be pickled")
+
+    def _record(self, filepath: Path, meta: Optional[Dict[str, str]]) -> Dict[str, str]:
+        meta = meta or {}
+        return {
+            'path': filepath.relative_to(self.output_dir).as_posix() if filepath.is_relative_to(self.output_dir) else str(filepath),
+            'url': meta.get('url', ''),
+            'title': meta.get('title', ''),
+            'fetched_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        }
+
+    def _put(self, item) -> None:
+        if self.error is not None:
+            raise RuntimeError(f"Shard writer failed: {self.error}")
+        self.records.put(item)
+
+    def write(self, filepath: Path, data: bytes, digest: Optional[str] = None,
+              meta: Optional[Dict[str, str]] = None) -> str:
+        digest = digest or hashlib.sha256(data).hexdigest()
+        if self.output_format == 'jsonl' and meta and meta.get('encoding'):
+            # Records hold text; raw bodies declared in another charset are transcoded
+            data = data.decode(meta['encoding'], errors='replace').encode('utf-8')
+        record = self._record(filepath, meta)
+        record['hash'] = digest
+        self._put((record, filepath.suffix, data))
+        return digest
+
+    def write_file(self, filepath: Path, source: Path, digest: str,
+                   meta: Optional[Dict[str, str]] = None, move: bool = False) -> str:
+        data = source.read_bytes()
+        if move:
+            source.unlink()
+        return self.write(filepath, data, digest, meta)
+
+    def link_existing(self, filepath: Path, digest: str, meta: Optional[Dict[str, str]] = None) -> bool:
+        if not self.dedup:
+            return False
+        record = self._record(filepath, meta)
+        record['hash'] = digest
+        # Resolved by the writer, which knows whether the digest has been stored yet
+        self._put((record, filepath.suffix, None))
+        return True
+
+    def _run(self) -> None:
+        while True:
+            item = self.records.get()
+            if item is None:
+                break
+            if self.error is not None:
+                continue
+            try:
+                self._store(*item)
+            except Exception as e:
+                self.error = e
+                logger.error(f"Shard writer failed: {e}")
+        try:
+            self._close_shard()
+            if self.index is not None:
+                self.index.close()
+        except Exception as e:
+            self.error = self.error or e
+
+    def _store(self, record: Dict[str, str], suffix: str, data: Optional[bytes]) -> None:
+        location = self.locations.get((record['hash'], suffix)) if self.dedup else None
+        if location is not None:
+            self.stats['duplicates'] += 1
+            self.stats['bytes_saved'] += location['size']
+        elif data is None:
+            raise ValueError(f"No stored content for {record['path']} ({record['hash']})")
+        else:
+            location = self._append(record, suffix, data)
+            if self.dedup:
+                self.locations[(record['hash'], suffix)] = location
+
+        self.stats['files'] += 1
+        if self.index is None:
+            self._ensure_dir(self.output_dir)
+            self.index = open(self.output_dir / 'index.jsonl', 'a', encoding='utf-8')
+        entry = {key: record[key] for key in ('path', 'url', 'title', 'hash')}
+        entry.update(location)
+        self.index.write(json.dumps(entry) + '\n')
+
+    def _append(self, record: Dict[str, str], suffix: str, data: bytes) -> Dict[str, int]:
+        if self.shard is None or self.shard.tell() >= self.shard_size:
+            self._open_shard()
+        offset = self.shard.tell()
+        if self.output_format == 'jsonl':
+            record = dict(record)
+            record[CONTENT_FIELDS.get(suffix, 'content')] = data.decode('utf-8', errors='replace')
+            self.shard.write(gzip.compress(json.dumps(record).encode('utf-8') + b'\n'))
+            length = self.shard.tell() - offset
+        else:
+            info = tarfile.TarInfo(record['path'])
+            info.size = len(data)
+            info.mtime = int(datetime.now(timezone.utc).timestamp())
+            self.archive.addfile(info, io.BytesIO(data))
+            # Point the index at the member data rather than its header
+            offset = self.shard.tell() - (len(data) + tarfile.BLOCKSIZE - 1) // tarfile.BLOCKSIZE * tarfile.BLOCKSIZE
+            length = len(data)
+        self.stats['bytes'] += len(data)
+        return {'shard': self.shard_name(self.shard_index), 'offset': offset, 'length': length, 'size': len(data)}
+
+    def shard_name(self, index: int) -> str:
+        extension = 'jsonl.gz' if self.output_format == 'jsonl' else 'tar'
+        return f"pages-{index:05d}.{extension}"
+
+    def _last_shard_index(self) -> int:
+        extension = self.shard_name(0)[len('pages-00000'):]
+        indexes = [path.name[len('pages-'):-len(extension)] for path in self.output_dir.glob(f'pages-*{extension}')]
+        return max((int(index) for index in indexes if index.isdigit()), default=-1)
+
+    def _open_shard(self) -> None:
+        self._close_shard()
+        self.shard_index += 1
+        self._ensure_dir(self.output_dir)
+        self.shard = open(self.output_dir / self.shard_name(self.shard_index), 'xb')
+        if self.output_format == 'tar':
+            self.archive = tarfile.open(fileobj=self.shard, mode='w', format=tarfile.PAX_FORMAT)
+        self.stats['shards'] += 1
+
+    def _close_shard(self) -> None:
+        if self.archive is not None:
+            self.archive.close()
+            self.archive = None
+        if self.shard is not None:
+            self.shard.close()
+            self.shard = None
+
+    def close(self) -> None:
+        """Drain the queue, finish the open shard and close the index."""
+        if self.writer.is_alive():
+            self.records.put(None)
+            self.writer.join()
+        if self.error is not None:
+            raise RuntimeError(f"Shard writer failed: {self.error}")
+
+def read_shard_record(output_dir: str, entry: Dict) -> bytes:
+    """Read the content of one ``index.jsonl`` entry back from its shard."""
+    with open(Path(output_dir) / entry['shard'], 'rb') as shard:
+        shard.seek(entry['offset'])
+        data = shard.read(entry['length'])
+    if entry['shard'].endswith('.jsonl.gz'):
+        record = json.loads(gzip.decompress(data))
+        field = CONTENT_FIELDS.get(Path(entry['path']).suffix, 'content')
+        return record[field].encode('utf-8')
+    return data
+
+def open_output_store(output_dir: str, dedup: bool, link_mode: str,
+                      output_format: str = 'files', shard_size: int = 256 * 1024 * 1024) -> OutputStore:
+    """Create the output store for the configured output layout."""
+    if output_format != 'files':
+        return ShardOutputStore(output_dir, output_format, shard_size, dedup)
+    if dedup:
+        return DedupOutputStore(output_dir, link_mode)
+    return OutputStore(output_dir)
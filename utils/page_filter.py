@@ -0,0 +1,68 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+from fnmatch import translate
+from typing import Dict, Iterable, List, Optional, Pattern, Sequence
+import re
+
+from utils.sitemap import SitemapEntry, parse_lastmod
+
+def compile_pattern(pattern: str) -> Pattern:
+    """Compile a URL pattern: 're:' prefixes a regex, anything else is a glob.
+
+    Regexes are searched anywhere in the URL; globs must match the whole URL,
+    e.g. '*/docs/storage/*'.
+    """
+    if pattern.startswith('re:'):
+        return re.compile(pattern[3:])
+    return re.compile(r'\A' + translate(pattern))
+
+@dataclass
+class PageFilter:
+    """Non-interactive replacement for select_pages.
+
+    A URL is kept when it matches any include pattern (or there are none),
+    matches no exclude pattern and, with ``since``, has a sitemap lastmod at
+    or after it. Pages without a lastmod are kept, since their age is unknown.
+    """
+    include: Sequence[str] = ()
+    exclude: Sequence[str] = ()
+    since: Optional[str] = None
+    max_pages: int = 0
+    include_patterns: List[Pattern] = field(init=False, repr=False)
+    exclude_patterns: List[Pattern] = field(init=False, repr=False)
+    since_time: Optional[datetime] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.include_patterns = [compile_pattern(pattern) for pattern in self.include]
+        self.exclude_patterns = [compile_pattern(pattern) for pattern in self.exclude]
+
+        if self.max_pages < 0:
+            raise ValueError("max_pages cannot be negative.")
+
+        self.since_time = parse_lastmod(self.since)
+        if self.since and self.since_time is None:
+            raise ValueError(f"Invalid since date: {self.since} (expected ISO 8601, e.g. 2024-01-31)")
+
+    def matches(self, url: str, entry: Optional[SitemapEntry] = None) -> bool:
+        """Check a single URL against the include/exclude patterns and since date."""
+        if self.include_patterns and not any(pattern.search(url) for pattern in self.include_patterns):
+            return False
+        if any(pattern.search(url) for pattern in self.exclude_patterns):
+            return False
+        if self.since_time is not None and entry is not None:
+            lastmod = parse_lastmod(entry.lastmod)
+            if lastmod is not None and lastmod < self.since_time:
+                return False
+        return True
+
+    def select(self, urls: Iterable[str], sitemap_meta: Optional[Dict[str, SitemapEntry]] = None) -> List[str]:
+        """Return the matching URLs in order, stopping at max_pages."""
+        sitemap_meta = sitemap_meta or {}
+        selected = []
+        for url in urls:
+            if not self.matches(url, sitemap_meta.get(url)):
+                continue
+            selected.append(url)
+            if self.max_pages and len(selected) >= self.max_pages:
+                break
+        return selected
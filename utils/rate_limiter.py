@@ -0,0 +1,156 @@
+from collections import deque
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from threading import Condition, Lock
+from typing import Optional
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+THROTTLE_STATUSES = (429, 503)
+
+# Recent latencies whose minimum is the uncongested baseline
+BASELINE_WINDOW = 100
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Convert a Retry-After header (seconds or HTTP date) into seconds to wait."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+class TokenBucket:
+    """Token bucket rate limiter shared by every worker.
+
+    reserve() never blocks; it books the next token and returns how long the
+    caller must wait, so threads can time.sleep() and coroutines can
+    asyncio.sleep() on the same bucket.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.lock = Lock()
+
+    def reserve(self) -> float:
+        """Take a token, returning the seconds to wait before using it."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def wait_time(self) -> float:
+        """Seconds until a token is available, without taking it."""
+        with self.lock:
+            tokens = min(self.burst, self.tokens + (time.monotonic() - self.updated) * self.rate)
+            return 0.0 if tokens >= 1 else (1 - tokens) / self.rate
+
+    def acquire(self) -> None:
+        """Block until a token is available."""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+class AdaptiveConcurrency:
+    """AIMD controller for the number of in-flight requests.
+
+    The limit grows by one after a full window of healthy responses and is
+    halved on throttling (429/503) or server errors. Growth stops while the
+    average latency exceeds the minimum of the last BASELINE_WINDOW
+    responses by ``latency_tolerance``; a windowed minimum lets one unusually
+    fast response (robots.txt, a 304) age out. Retry-After pauses all new
+    requests until the server is ready again.
+    """
+
+    def __init__(self, maximum: int, minimum: int = 1, initial: Optional[int] = None,
+                 latency_tolerance: float = 3.0):
+        self.maximum = max(maximum, 1)
+        self.minimum = max(min(minimum, self.maximum), 1)
+        self.limit = float(initial if initial is not None else max(self.maximum // 2, self.minimum))
+        self.latency_tolerance = latency_tolerance
+        self.in_flight = 0
+        self.successes = 0
+        self.recent_latencies = deque(maxlen=BASELINE_WINDOW)
+        self.average_latency = None
+        self.paused_until = 0.0
+        self.last_decrease = 0.0
+        self.condition = Condition()
+        self.stats = {'increases': 0, 'decreases': 0, 'throttled': 0}
+
+    def try_acquire(self) -> bool:
+        """Claim a request slot without blocking."""
+        with self.condition:
+            if time.monotonic() < self.paused_until or self.in_flight >= int(self.limit):
+                return False
+            self.in_flight += 1
+            return True
+
+    def acquire(self) -> None:
+        """Block until a request slot is free and no pause is in effect."""
+        with self.condition:
+            while True:
+                pause = self.paused_until - time.monotonic()
+                if pause > 0:
+                    self.condition.wait(pause)
+                elif self.in_flight >= int(self.limit):
+                    self.condition.wait(0.5)
+                else:
+                    self.in_flight += 1
+                    return
+
+    def release(self, latency: Optional[float], status: Optional[int], retry_after: Optional[float] = None) -> None:
+        """Free a slot and adjust the limit from the request outcome.
+
+        A status of None means the request failed without a response.
+        """
+        with self.condition:
+            self.in_flight -= 1
+            if status is None or status in THROTTLE_STATUSES or status >= 500:
+                self._decrease(status, retry_after)
+            else:
+                self._observe(latency)
+            self.condition.notify_all()
+
+    def _observe(self, latency: Optional[float]) -> None:
+        if latency is not None:
+            self.average_latency = latency if self.average_latency is None else 0.8 * self.average_latency + 0.2 * latency
+            self.recent_latencies.append(latency)
+            if self.average_latency > min(self.recent_latencies) * self.latency_tolerance:
+                # Latency is climbing: hold the current limit rather than adding load
+                self.successes = 0
+                return
+
+        self.successes += 1
+        if self.successes >= int(self.limit) and self.limit < self.maximum:
+            self.limit += 1
+            self.successes = 0
+            self.stats['increases'] += 1
+
+    def _decrease(self, status: Optional[int], retry_after: Optional[float]) -> None:
+        self.successes = 0
+        now = time.monotonic()
+        # Errors from one congestion event arrive together; only back off once per round trip
+        if now - self.last_decrease > max(self.average_latency or 0.0, 0.5):
+            self.limit = max(self.minimum, self.limit / 2)
+            self.last_decrease = now
+            self.stats['decreases'] += 1
+        if status in THROTTLE_STATUSES:
+            self.stats['throttled'] += 1
+            if retry_after:
+                self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+                logger.warning(f"Server asked to retry after {retry_after:.1f}s, pausing requests")
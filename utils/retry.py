@@ -0,0 +1,126 @@
+from dataclasses import dataclass
+from threading import Lock
+from typing import Optional, Tuple
+import logging
+import random
+import time
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+class CircuitOpenError(requests.RequestException):
+    """Raised instead of sending a request while the circuit breaker is open."""
+
+@dataclass
+class RetryPolicy:
+    """Configurable retry behaviour for crawler requests."""
+    max_attempts: int = 3
+    base_delay: float = 1
+    max_delay: float = 30
+    jitter: bool = True
+    retryable_statuses: Tuple[int, ...] = (408, 425, 429, 500, 502, 503, 504)
+    retry_budget: int = 500
+    breaker_threshold: int = 20
+    breaker_cooldown: float = 30
+
+    def __post_init__(self):
+        if self.max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1.")
+
+        if self.base_delay < 0 or self.max_delay < 0:
+            raise ValueError("retry delays cannot be negative.")
+
+        if self.retry_budget < 0:
+            raise ValueError("retry_budget cannot be negative.")
+
+        if self.breaker_threshold < 1:
+            raise ValueError("breaker_threshold must be at least 1.")
+
+    def is_retryable_status(self, status: int) -> bool:
+        """Return True for transient statuses; other 4xx/5xx are terminal."""
+        return status in self.retryable_statuses
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Seconds to wait before the next attempt (attempt counts from 0).
+
+        Exponential backoff with full jitter, capped at max_delay. A server
+        supplied Retry-After takes precedence when it asks for longer.
+        """
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+class CircuitBreaker:
+    """Per-crawl retry budget and circuit breaker for a failing origin.
+
+    After ``breaker_threshold`` consecutive failures the circuit opens and
+    requests fail fast for ``breaker_cooldown`` seconds. It then goes half
+    open: a single trial request is let through while the others keep
+    failing fast, and its outcome closes the circuit or opens it for another
+    cooldown. A trial that never reports back is replaced after a cooldown.
+    """
+
+    def __init__(self, policy: RetryPolicy):
+        self.policy = policy
+        self.lock = Lock()
+        self.consecutive_failures = 0
+        self.opened = False
+        self.open_until = 0.0
+        self.trial_started = None
+        self.retries_spent = 0
+        self.stats = {'retries': 0, 'budget_exhausted': 0, 'circuit_opened': 0, 'rejected': 0}
+
+    def before_request(self) -> None:
+        """Raise CircuitOpenError while the circuit is open, except for a half-open trial."""
+        with self.lock:
+            if not self.opened:
+                return
+            now = time.monotonic()
+            if now >= self.open_until and (
+                self.trial_started is None or now - self.trial_started >= self.policy.breaker_cooldown
+            ):
+                self.trial_started = now
+                return
+            self.stats['rejected'] += 1
+            raise CircuitOpenError("Circuit open: origin is failing, request skipped")
+
+    def record_success(self) -> None:
+        with self.lock:
+            self.consecutive_failures = 0
+            # Requests sent before the circuit opened don't count, only the trial
+            if self.opened and self.trial_started is not None:
+                self.opened = False
+                self.trial_started = None
+                logger.info("Origin is responding again, resuming requests")
+
+    def record_failure(self) -> None:
+        with self.lock:
+            if self.opened:
+                if self.trial_started is not None:
+                    self._open()
+                return
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= self.policy.breaker_threshold:
+                self._open()
+
+    def _open(self) -> None:
+        self.opened = True
+        self.open_until = time.monotonic() + self.policy.breaker_cooldown
+        self.trial_started = None
+        self.consecutive_failures = 0
+        self.stats['circuit_opened'] += 1
+        logger.warning(f"Origin is failing, pausing requests for {self.policy.breaker_cooldown:.0f}s")
+
+    def spend_retry(self) -> bool:
+        """Take one retry from the crawl's budget, returning False when exhausted."""
+        with self.lock:
+            if self.retries_spent >= self.policy.retry_budget:
+                self.stats['budget_exhausted'] += 1
+                return False
+            self.retries_spent += 1
+            self.stats['retries'] += 1
+            return True
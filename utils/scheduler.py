@@ -0,0 +1,162 @@
+from collections import deque
+from concurrent.futures import Executor, Future, wait as wait_for
+from threading import Condition, Lock, Thread
+from typing import Callable, Dict, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Longest a blocked worker sleeps before re-checking limits that change without notice (AIMD, pauses)
+POLL_INTERVAL = 0.1
+
+class HostExecutor(Executor):
+    """One host's view of a FairScheduler, usable wherever a ThreadPoolExecutor is.
+
+    shutdown() waits for the tasks submitted through this view; the shared
+    workers keep running for the other hosts.
+    """
+
+    def __init__(self, scheduler: 'FairScheduler', host: str):
+        self.scheduler = scheduler
+        self.host = host
+        self.futures = set()
+        self.lock = Lock()
+
+    def submit(self, fn: Callable, /, *args, **kwargs) -> Future:
+        future = Future()
+        with self.lock:
+            self.futures.add(future)
+        future.add_done_callback(self._forget)
+        self.scheduler.put(self.host, (future, fn, args, kwargs))
+        return future
+
+    def _forget(self, future: Future) -> None:
+        with self.lock:
+            self.futures.discard(future)
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        with self.lock:
+            futures = list(self.futures)
+        if cancel_futures:
+            for future in futures:
+                future.cancel()
+        if wait:
+            wait_for(futures)
+
+class FairScheduler:
+    """Worker pool shared by several hosts that interleaves their tasks fairly.
+
+    Every host has its own FIFO queue and politeness budget: at most
+    ``per_host`` tasks in flight, lowered further by the host's ``limit``
+    callback (e.g. its adaptive concurrency limit), and none while its
+    ``delay`` callback reports a wait (Retry-After pause, empty rate bucket).
+    Idle workers serve the ready hosts round-robin, so a slow or throttled
+    host holds back only its own queue.
+    """
+
+    def __init__(self, workers: int, per_host: int):
+        self.per_host = max(per_host, 1)
+        self.condition = Condition()
+        self.queues: Dict[str, deque] = {}
+        self.in_flight: Dict[str, int] = {}
+        self.limits: Dict[str, Optional[Callable[[], int]]] = {}
+        self.delays: Dict[str, Optional[Callable[[], float]]] = {}
+        self.hosts = []
+        self.next_host = 0
+        self.closed = False
+        self.stats = {'tasks': {}, 'peak_in_flight': {}}
+        self.threads = [
+            Thread(target=self._work, name=f'worker-{index}', daemon=True)
+            for index in range(max(workers, 1))
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def add_host(self, host: str, limit: Optional[Callable[[], int]] = None,
+                 delay: Optional[Callable[[], float]] = None) -> None:
+        """Register a host and the callbacks that bound its share of the workers."""
+        with self.condition:
+            if host not in self.queues:
+                self.queues[host] = deque()
+                self.in_flight[host] = 0
+                self.hosts.append(host)
+                self.stats['tasks'][host] = 0
+                self.stats['peak_in_flight'][host] = 0
+            self.limits[host] = limit
+            self.delays[host] = delay
+
+    def executor(self, host: str) -> HostExecutor:
+        """Return an Executor that queues tasks for ``host``."""
+        with self.condition:
+            registered = host in self.queues
+        if not registered:
+            self.add_host(host)
+        return HostExecutor(self, host)
+
+    def put(self, host: str, task: Tuple[Future, Callable, tuple, dict]) -> None:
+        with self.condition:
+            if self.closed:
+                raise RuntimeError('cannot schedule new tasks after close')
+            self.queues[host].append(task)
+            self.condition.notify()
+
+    def _host_limit(self, host: str) -> int:
+        limit = self.limits[host]
+        if limit is None:
+            return self.per_host
+        return max(min(limit(), self.per_host), 1)
+
+    def _next_task(self) -> Tuple[Optional[str], Optional[tuple], Optional[float]]:
+        """Pick the next ready host after the last one served.
+
+        Returns the host and task, or no task and how long until a paused
+        host may be ready.
+        """
+        retry_in = None
+        count = len(self.hosts)
+        for offset in range(count):
+            host = self.hosts[(self.next_host + offset) % count]
+            if not self.queues[host] or self.in_flight[host] >= self._host_limit(host):
+                continue
+            delay = self.delays[host]() if self.delays[host] is not None else 0.0
+            if delay > 0:
+                retry_in = delay if retry_in is None else min(retry_in, delay)
+                continue
+            self.next_host = (self.next_host + offset + 1) % count
+            self.in_flight[host] += 1
+            self.stats['tasks'][host] += 1
+            self.stats['peak_in_flight'][host] = max(self.stats['peak_in_flight'][host], self.in_flight[host])
+            return host, self.queues[host].popleft(), None
+        return None, None, retry_in
+
+    def _work(self) -> None:
+        while True:
+            with self.condition:
+                while True:
+                    host, task, retry_in = self._next_task()
+                    if task is not None:
+                        break
+                    if self.closed and not any(self.queues.values()):
+                        return
+                    self.condition.wait(min(retry_in or POLL_INTERVAL, POLL_INTERVAL))
+
+            future, fn, args, kwargs = task
+            try:
+                if future.set_running_or_notify_cancel():
+                    try:
+                        future.set_result(fn(*args, **kwargs))
+                    except BaseException as e:
+                        future.set_exception(e)
+            finally:
+                with self.condition:
+                    self.in_flight[host] -= 1
+                    # Frees a slot for this host, which another worker may be waiting on
+                    self.condition.notify_all()
+
+    def close(self) -> None:
+        """Run the queued tasks to completion and stop the workers."""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        for thread in self.threads:
+            thread.join()
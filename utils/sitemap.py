@@ -0,0 +1,102 @@
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import List, Optional
+import xml.etree.ElementTree as ET
+import zlib
+
+SITEMAP_NAMESPACE = '{http://www.sitemaps.org/schemas/sitemap/0.9}'
+GZIP_MAGIC = b'\x1f\x8b'
+
+@dataclass
+class SitemapEntry:
+    """A <url> or <sitemap> entry with its optional change metadata."""
+    loc: str
+    lastmod: Optional[str] = None
+    changefreq: Optional[str] = None
+    is_sitemap: bool = False
+
+def parse_lastmod(value: Optional[str]) -> Optional[datetime]:
+    """Parse a W3C datetime sitemap lastmod value into an aware datetime."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+def is_sitemap_url(url: str) -> bool:
+    """Guess whether a URL points at a sitemap document rather than a page."""
+    return url.endswith(('.xml', '.xml.gz'))
+
+class SitemapStreamParser:
+    """Incremental sitemap parser that yields entries as bytes arrive.
+
+    Each completed <url>/<sitemap> element is turned into a SitemapEntry and
+    then discarded, so memory stays flat regardless of sitemap size. Gzipped
+    documents (.xml.gz) are detected by their magic bytes and inflated on the
+    fly.
+    """
+
+    def __init__(self):
+        self.parser = ET.XMLPullParser(events=('start', 'end'))
+        self.root = None
+        self.decompressor = None
+        self.sniffed = False
+        self.pending = b''
+
+    def feed(self, chunk: bytes) -> List[SitemapEntry]:
+        """Feed raw bytes and return the entries completed by them."""
+        if not self.sniffed:
+            self.pending += chunk
+            if len(self.pending) < len(GZIP_MAGIC):
+                return []
+            chunk, self.pending, self.sniffed = self.pending, b'', True
+            if chunk.startswith(GZIP_MAGIC):
+                self.decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+        if self.decompressor is not None:
+            chunk = self.decompressor.decompress(chunk)
+        self.parser.feed(chunk)
+        return self._drain()
+
+    def close(self) -> List[SitemapEntry]:
+        """Flush remaining input and return any final entries."""
+        if not self.sniffed and self.pending:
+            self.sniffed = True
+            self.parser.feed(self.pending)
+        if self.decompressor is not None:
+            self.parser.feed(self.decompressor.flush())
+        self.parser.close()
+        return self._drain()
+
+    def _drain(self) -> List[SitemapEntry]:
+        entries = []
+        for event, element in self.parser.read_events():
+            if event == 'start':
+                if self.root is None:
+                    self.root = element
+                continue
+
+            if element.tag not in (f'{SITEMAP_NAMESPACE}url', f'{SITEMAP_NAMESPACE}sitemap'):
+                continue
+
+            loc = element.findtext(f'{SITEMAP_NAMESPACE}loc')
+            if loc:
+                entries.append(SitemapEntry(
+                    loc=loc.strip(),
+                    lastmod=element.findtext(f'{SITEMAP_NAMESPACE}lastmod'),
+                    changefreq=element.findtext(f'{SITEMAP_NAMESPACE}changefreq'),
+                    is_sitemap=element.tag == f'{SITEMAP_NAMESPACE}sitemap'
+                ))
+            # Drop the processed subtree so the document never accumulates
+            self.root.clear()
+        return entries
+
+    @classmethod
+    def parse(cls, content: bytes) -> List[SitemapEntry]:
+        """Parse a complete sitemap document held in memory."""
+        parser = cls()
+        return parser.feed(content) + parser.close()
@@ -0,0 +1,169 @@
+from abc import ABC, abstractmethod
+from pathlib import Path
+from threading import Lock
+from typing import Iterable, List, Optional, Tuple
+import json
+import logging
+import sqlite3
+
+logger = logging.getLogger(__name__)
+
+STATE_FIELDS = ('hash', 'etag', 'last_modified', 'lastmod', 'changefreq')
+
+class StateStore(ABC):
+    """Interface for persisting per-page crawl state between runs.
+
+    Pages are keyed by a normalised form of their URL, so every spelling of
+    a URL finds the same state.
+    """
+
+    @abstractmethod
+    def get(self, url: str) -> Optional[dict]:
+        """Return the stored state for a URL, if any."""
+
+    @abstractmethod
+    def set(self, url: str, state: dict) -> None:
+        """Store the state of a completed page."""
+
+    def begin_run(self, pages: Iterable[Tuple[str, str]]) -> None:
+        """Record the pages a crawl is about to process, as (key, URL) pairs."""
+
+    def pending(self) -> List[str]:
+        """Return the URLs of pages left unfinished by an interrupted crawl."""
+        return []
+
+    def end_run(self) -> None:
+        """Mark the current crawl as complete."""
+
+    def flush(self) -> None:
+        """Persist any buffered state."""
+
+    def close(self) -> None:
+        self.flush()
+
+class JSONStateStore(StateStore):
+    """Whole-file JSON state store, written once at the end of a crawl."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.states = {}
+        self.lock = Lock()
+        if self.path.exists():
+            with self.path.open('r') as f:
+                states = json.load(f)
+            # Older state files stored only the content hash per URL
+            self.states = {
+                url: state if isinstance(state, dict) else {'hash': state}
+                for url, state in states.items()
+            }
+
+    def get(self, url: str) -> Optional[dict]:
+        return self.states.get(url)
+
+    def set(self, url: str, state: dict) -> None:
+        with self.lock:
+            self.states[url] = state
+
+    def flush(self) -> None:
+        with self.lock:
+            with self.path.open('w') as f:
+                json.dump(self.states, f, indent=4)
+
+class SQLiteStateStore(StateStore):
+    """SQLite (WAL mode) state store that commits every page as it completes.
+
+    Lookups hit the database directly, so opening the store costs the same
+    regardless of how many pages were crawled before. The run table doubles as
+    a checkpoint of which selected pages are still outstanding.
+    """
+
+    def __init__(self, path: str, legacy_json: Optional[str] = None):
+        self.path = Path(path)
+        is_new = not self.path.exists()
+        self.lock = Lock()
+        self.connection = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS pages ('
+            'url TEXT PRIMARY KEY, hash TEXT, etag TEXT, last_modified TEXT, lastmod TEXT, changefreq TEXT)'
+        )
+        # The run's url column holds the page key; fetch_url the URL as selected
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS run (url TEXT PRIMARY KEY, done INTEGER NOT NULL DEFAULT 0, fetch_url TEXT)'
+        )
+        columns = {row[1] for row in self.connection.execute('PRAGMA table_info(run)')}
+        if 'fetch_url' not in columns:
+            self.connection.execute('ALTER TABLE run ADD COLUMN fetch_url TEXT')
+
+        if is_new and legacy_json and Path(legacy_json).exists():
+            self._import_json(legacy_json)
+
+    def _import_json(self, legacy_json: str) -> None:
+        legacy = JSONStateStore(legacy_json)
+        logger.info(f"Importing {len(legacy.states):,} page states from {legacy_json}")
+        with self.lock:
+            self.connection.execute('BEGIN')
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?)',
+                ((url, *(state.get(field) for field in STATE_FIELDS)) for url, state in legacy.states.items())
+            )
+            self.connection.execute('COMMIT')
+
+    def get(self, url: str) -> Optional[dict]:
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT hash, etag, last_modified, lastmod, changefreq FROM pages WHERE url = ?', (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(STATE_FIELDS, row))
+
+    def set(self, url: str, state: dict) -> None:
+        with self.lock:
+            self.connection.execute('BEGIN')
+            self.connection.execute(
+                'INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?)',
+                (url, *(state.get(field) for field in STATE_FIELDS))
+            )
+            self.connection.execute('UPDATE run SET done = 1 WHERE url = ?', (url,))
+            self.connection.execute('COMMIT')
+
+    def begin_run(self, pages: Iterable[Tuple[str, str]]) -> None:
+        with self.lock:
+            self.connection.execute('BEGIN')
+            self.connection.execute('DELETE FROM run')
+            self.connection.executemany('INSERT OR IGNORE INTO run (url, fetch_url) VALUES (?, ?)', pages)
+            self.connection.execute('COMMIT')
+
+    def pending(self) -> List[str]:
+        with self.lock:
+            rows = self.connection.execute(
+                'SELECT COALESCE(fetch_url, url) FROM run WHERE done = 0 ORDER BY rowid'
+            ).fetchall()
+        return [url for (url,) in rows]
+
+    def end_run(self) -> None:
+        with self.lock:
+            self.connection.execute('DELETE FROM run')
+
+    def flush(self) -> None:
+        with self.lock:
+            self.connection.execute('PRAGMA wal_checkpoint(PASSIVE)')
+
+    def close(self) -> None:
+        self.flush()
+        with self.lock:
+            self.connection.close()
+
+def open_state_store(backend: str, path: str) -> StateStore:
+    """Create the state store for the configured backend.
+
+    A new SQLite store imports the JSON state file of the same name, e.g.
+    crawler_state.json for crawler_state.db, so each store only picks up
+    its own legacy state.
+    """
+    if backend == 'sqlite':
+        legacy_json = Path(path).with_suffix('.json')
+        return SQLiteStateStore(path, legacy_json=str(legacy_json) if legacy_json != Path(path) else None)
+    return JSONStateStore(path)
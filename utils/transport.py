@@ -0,0 +1,378 @@
+from threading import Lock, local
+from typing import Dict, List, Optional
+import logging
+import time
+import zlib
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from utils.body_cache import BodySink, CachedBody
+from utils.http_cache import HTTPCache
+from utils.metrics import Metrics
+from utils.rate_limiter import AdaptiveConcurrency, TokenBucket, parse_retry_after
+
+logger = logging.getLogger(__name__)
+
+# Brotli and zstd are offered only when a decoder is installed; urllib3 uses the same modules
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+def supported_encodings() -> List[str]:
+    """Content codings this process can decode, best compression first."""
+    encodings = []
+    if zstandard is not None:
+        encodings.append('zstd')
+    if brotli is not None:
+        encodings.append('br')
+    return encodings + ['gzip', 'deflate']
+
+ACCEPT_ENCODING = ', '.join(supported_encodings())
+
+class _GzipDecoder:
+    def __init__(self):
+        self.decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+    def decompress(self, data: bytes) -> bytes:
+        output = []
+        while data:
+            output.append(self.decompressor.decompress(data))
+            data = self.decompressor.unused_data
+            if data:
+                # Concatenated gzip members
+                self.decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        return b''.join(output)
+
+    def flush(self) -> bytes:
+        return self.decompressor.flush()
+
+class _DeflateDecoder:
+    def __init__(self):
+        self.decompressor = zlib.decompressobj()
+        self.started = False
+
+    def decompress(self, data: bytes) -> bytes:
+        if self.started or not data:
+            return self.decompressor.decompress(data)
+        self.started = True
+        try:
+            return self.decompressor.decompress(data)
+        except zlib.error:
+            # Some servers send raw deflate without the zlib header
+            self.decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+            return self.decompressor.decompress(data)
+
+    def flush(self) -> bytes:
+        return self.decompressor.flush()
+
+class _BrotliDecoder:
+    def __init__(self):
+        self.decompressor = brotli.Decompressor()
+
+    def decompress(self, data: bytes) -> bytes:
+        if hasattr(self.decompressor, 'process'):
+            return self.decompressor.process(data)
+        return self.decompressor.decompress(data)
+
+    def flush(self) -> bytes:
+        return b''
+
+class _ZstdDecoder:
+    def __init__(self):
+        self.decompressor = zstandard.ZstdDecompressor().decompressobj()
+
+    def decompress(self, data: bytes) -> bytes:
+        return self.decompressor.decompress(data)
+
+    def flush(self) -> bytes:
+        return b''
+
+DECODERS = {'gzip': _GzipDecoder, 'x-gzip': _GzipDecoder, 'deflate': _DeflateDecoder}
+if brotli is not None:
+    DECODERS['br'] = _BrotliDecoder
+if zstandard is not None:
+    DECODERS['zstd'] = _ZstdDecoder
+
+class ContentDecoder:
+    """Incremental decoder for a response's Content-Encoding.
+
+    For clients that hand over the body as sent (aiohttp with
+    auto_decompress disabled), so wire and decoded sizes can both be
+    counted. Unknown codings are passed through unchanged.
+    """
+
+    def __init__(self, content_encoding: Optional[str]):
+        codings = [coding.strip().lower() for coding in (content_encoding or '').split(',')]
+        # Codings are listed in the order they were applied
+        self.decoders = [DECODERS[coding]() for coding in reversed(codings) if coding in DECODERS]
+
+    def decompress(self, data: bytes) -> bytes:
+        for decoder in self.decoders:
+            data = decoder.decompress(data)
+        return data
+
+    def flush(self) -> bytes:
+        data = b''
+        for decoder in self.decoders:
+            data = (decoder.decompress(data) if data else b'') + decoder.flush()
+        return data
+
+# Connections are opened on the requesting thread, so connect() leaves its
+# duration here for HTTPTransport.get to pick up.
+_connect_time = local()
+
+class TimedConnectionMixin:
+    """Records how long connect() (DNS, TCP and TLS) takes."""
+
+    def connect(self) -> None:
+        started = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _connect_time.seconds = getattr(_connect_time, 'seconds', 0.0) + time.perf_counter() - started
+
+class TimedHTTPConnection(TimedConnectionMixin, HTTPConnection):
+    pass
+
+class TimedHTTPSConnection(TimedConnectionMixin, HTTPSConnection):
+    pass
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose pooled connections report their connect time."""
+
+    def init_poolmanager(self, *args, **kwargs) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': TimedHTTPConnectionPool,
+            'https': TimedHTTPSConnectionPool
+        }
+
+class HTTPTransport:
+    """Shared, thread-safe HTTP transport with keep-alive connection pooling."""
+
+    def __init__(self, headers: dict, timeout: int, pool_size: int = 10,
+                 rate_limiter: Optional[TokenBucket] = None,
+                 concurrency: Optional[AdaptiveConcurrency] = None,
+                 metrics: Optional[Metrics] = None,
+                 cache: Optional[HTTPCache] = None):
+        self.headers = headers
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.rate_limiter = rate_limiter
+        self.concurrency = concurrency
+        self.metrics = metrics
+        self.cache = cache
+
+        # One session shared by every worker; the adapter pool is sized to the
+        # worker count so each thread can hold a kept-alive connection.
+        self.session = requests.Session()
+        self.session.headers['Accept-Encoding'] = ACCEPT_ENCODING
+        self.session.headers.update(headers)
+        self.adapter = TimedHTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=0
+        )
+        self.session.mount('http://', self.adapter)
+        self.session.mount('https://', self.adapter)
+
+        self.lock = Lock()
+        self.request_count = 0
+        self.wire_bytes = 0
+        self.decoded_bytes = 0
+
+    def get(self, url: str, headers: Optional[dict] = None, **kwargs) -> requests.Response:
+        """Issue a GET request, answered from the HTTP cache when possible.
+
+        Without a cache this is send(). With one, fresh entries are served
+        from disk, stale ones are revalidated, and cacheable responses are
+        downloaded into the cache and then served from it. Responses read
+        from the cache have ``from_cache`` set.
+        """
+        if self.cache is None:
+            return self.send(url, headers, **kwargs)
+
+        entry, request_headers = self.cache.prepare(url, headers)
+        if request_headers is None:
+            return self.cache.response(entry)
+
+        stream = kwargs.pop('stream', False)
+        response = self.send(url, request_headers, stream=True, **kwargs)
+        if response.status_code == 304 and entry is not None:
+            self.record_bytes(response.raw.tell(), 0)
+            response.close()
+            return self.cache.response(self.cache.refresh(entry, response.headers))
+        if not self.cache.is_cacheable(response.status_code, response.headers):
+            if not stream:
+                self.record_bytes(response.raw.tell(), len(response.content))
+                response.close()
+            return response
+
+        sink = BodySink(spool_dir=self.cache.temp_dir)
+        try:
+            for chunk in response.iter_content(64 * 1024):
+                sink.feed(chunk)
+        except BaseException:
+            sink.abort()
+            self.record_bytes(response.raw.tell(), sink.size)
+            raise
+        finally:
+            response.close()
+        size = sink.size
+        body = sink.finish(CachedBody(url))
+        entry = self.cache.store(url, response.url, response.status_code, response.headers, body)
+        if entry is None:
+            # Not cached after all: serve the downloaded copy, counted like any other response
+            response._content = body.path.read_bytes()
+            body.discard()
+            if not stream:
+                self.record_bytes(response.raw.tell(), size)
+            return response
+        self.record_bytes(response.raw.tell(), size)
+        return self.cache.response(entry)
+
+    def send(self, url: str, headers: Optional[dict] = None, **kwargs) -> requests.Response:
+        """Issue a GET request over the pooled session.
+
+        Requests are paced by the shared rate limiter and admitted by the
+        adaptive concurrency controller when they are configured. A streamed
+        response keeps its concurrency slot until it is closed, so callers
+        must close it. With metrics, the queue, connect, TTFB and (unless
+        streaming) download times and body size of each request are recorded.
+        """
+        with self.lock:
+            self.request_count += 1
+        kwargs.setdefault('timeout', self.timeout)
+
+        queued = time.monotonic()
+        if self.concurrency is not None:
+            self.concurrency.acquire()
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+
+        started = time.monotonic()
+        status = None
+        retry_after = None
+        released_on_close = False
+        _connect_time.seconds = 0.0
+        try:
+            response = self.session.get(url, headers=headers, **kwargs)
+            status = response.status_code
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            if not kwargs.get('stream'):
+                self.record_bytes(response.raw.tell(), len(response.content))
+            if self.metrics is not None:
+                self.record_timings(url, response, started - queued, time.monotonic() - started, kwargs.get('stream', False))
+            if kwargs.get('stream') and self.concurrency is not None:
+                self._release_on_close(response, time.monotonic() - started, status, retry_after)
+                released_on_close = True
+            return response
+        finally:
+            if self.concurrency is not None and not released_on_close:
+                self.concurrency.release(time.monotonic() - started, status, retry_after)
+
+    def _release_on_close(self, response: requests.Response, latency: float, status: int,
+                          retry_after: Optional[float]) -> None:
+        """Keep a streamed response in flight until its body is closed.
+
+        The controller still sees the latency up to the headers, as for
+        any streamed request.
+        """
+        close = response.close
+        released = Lock()
+
+        def close_and_release() -> None:
+            try:
+                close()
+            finally:
+                if released.acquire(blocking=False):
+                    self.concurrency.release(latency, status, retry_after)
+
+        response.close = close_and_release
+
+    def record_timings(self, url: str, response: requests.Response, queued: float, elapsed: float, stream: bool) -> None:
+        """Split one request into its stages and add them to the metrics."""
+        connect = _connect_time.seconds
+        # requests measures elapsed up to the parsed headers, connect included
+        ttfb = max(response.elapsed.total_seconds() - connect, 0.0)
+        self.metrics.observe('queue', queued)
+        if connect:
+            self.metrics.observe('connect', connect)
+        self.metrics.observe('ttfb', ttfb)
+        if stream:
+            logger.debug(f"GET {url}: {response.status_code} connect {connect * 1000:.1f} ms, ttfb {ttfb * 1000:.1f} ms")
+            return
+        download = max(elapsed - response.elapsed.total_seconds(), 0.0)
+        self.metrics.observe('download', download)
+        self.metrics.observe_bytes('response_bytes', len(response.content))
+        logger.debug(
+            f"GET {url}: {response.status_code} queue {queued * 1000:.1f} ms, connect {connect * 1000:.1f} ms, "
+            f"ttfb {ttfb * 1000:.1f} ms, download {download * 1000:.1f} ms, {len(response.content):,} bytes"
+        )
+
+    def record_response_bytes(self, response: requests.Response, decoded: int) -> None:
+        """Count a streamed response once its body has been read.
+
+        Bodies served from the HTTP cache were counted when they were
+        downloaded, if at all.
+        """
+        if not getattr(response, 'from_cache', False):
+            self.record_bytes(response.raw.tell(), decoded)
+
+    def record_bytes(self, wire: int, decoded: int) -> None:
+        """Count a response body's size as transferred and after decompression.
+
+        Streamed responses are counted by whoever reads them; raw.tell() gives
+        the bytes read from the socket so far.
+        """
+        with self.lock:
+            self.wire_bytes += wire
+            self.decoded_bytes += decoded
+
+    def stats(self) -> Dict[str, int]:
+        """Return request and connection reuse counters for this transport."""
+        connections = 0
+        pools = self.adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                connections += pool.num_connections
+
+        with self.lock:
+            requests_made = self.request_count
+            wire_bytes = self.wire_bytes
+            decoded_bytes = self.decoded_bytes
+
+        stats = {
+            'requests': requests_made,
+            'connections': connections,
+            'reused': max(requests_made - connections, 0),
+            'wire_bytes': wire_bytes,
+            'decoded_bytes': decoded_bytes
+        }
+        if self.concurrency is not None:
+            stats['concurrency_limit'] = int(self.concurrency.limit)
+            stats['throttled'] = self.concurrency.stats['throttled']
+        return stats
+
+    def close(self) -> None:
+        """Close all pooled connections."""
+        self.session.close()
@@ -1,78 +1,186 @@
-from typing import List, Optional
-from urllib.parse import urljoin, urlparse, parse_qs
-import xml.etree.ElementTree as ET
+from threading import Lock
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence
+from urllib.parse import urljoin, parse_qs, urlsplit, urlunsplit
 import requests
 import logging
 import re
 
+from utils.transport import HTTPTransport
+from utils.sitemap import SitemapEntry, SitemapStreamParser
+from utils.page_filter import compile_pattern
+
 logger = logging.getLogger(__name__)
 
 class URLProcessor:
     """Handles URL processing, validation, and sitemap parsing."""
     
-    def __init__(self, domain: str, base_paths: List[str], headers: dict, timeout: int):
+    def __init__(self, domain: str, base_paths: List[str], headers: dict, timeout: int,
+                 transport: Optional[HTTPTransport] = None,
+                 include: Sequence[str] = (), exclude: Sequence[str] = (),
+                 scheme: Optional[str] = None):
         self.domain = domain
+        self.scheme = scheme
         self.base_paths = base_paths
         self.headers = headers
         self.timeout = timeout
+        self.transport = transport or HTTPTransport(headers=headers, timeout=timeout)
+        self.seen_sitemaps = set()
+        self.seen_lock = Lock()
+        self.url_pattern = self.compile_url_pattern(domain, base_paths)
+        self.include_patterns = [compile_pattern(pattern) for pattern in include]
+        self.exclude_patterns = [compile_pattern(pattern) for pattern in exclude]
+
+    @staticmethod
+    def compile_url_pattern(domain: str, base_paths: Sequence[str]) -> re.Pattern:
+        """Build one regex matching the domain and any base path, capturing the query.
+
+        Equivalent to comparing urlparse().netloc and calling startswith on
+        urlparse().path for each base path, without parsing the URL.
+        """
+        # With no base paths nothing is relevant, as with the startswith loop
+        paths = '|'.join(re.escape(path) for path in base_paths) if base_paths else '(?!)'
+        return re.compile(
+            rf'(?:[A-Za-z][A-Za-z0-9+.-]*:)?//{re.escape(domain)}(?=[/?#]|\Z)'
+            rf'(?:{paths})[^?#]*(?:\?([^#]*))?'
+        )
+
+    @staticmethod
+    def url_language(query: str) -> Optional[str]:
+        """Return the first non-empty hl= value of a query string, like parse_qs."""
+        if '%' in query or '+' in query:
+            # Escaped names or values need full decoding
+            return parse_qs(query).get('hl', [None])[0]
+        if 'hl=' not in query:
+            return None
+        for param in query.split('&'):
+            if param.startswith('hl=') and len(param) > 3:
+                return param[3:]
+        return None
+
+    def canonicalize(self, url: str) -> str:
+        """Normalise a URL so variants of the same page compare equal.
+
+        Lowercases the scheme and host, drops default ports, fragments, empty
+        query segments and trailing slashes, sorts query parameters, and
+        uses the crawl's scheme for http/https URLs on the crawled domain.
+        """
+        parts = urlsplit(url.strip())
+        scheme = parts.scheme.lower()
+        netloc = parts.netloc.lower()
+        if (scheme == 'http' and netloc.endswith(':80')) or (scheme == 'https' and netloc.endswith(':443')):
+            netloc = netloc.rsplit(':', 1)[0]
+        if self.scheme and scheme in ('http', 'https') and netloc == self.domain.lower():
+            scheme = self.scheme
+
+        path = parts.path.rstrip('/') or '/'
+        query = '&'.join(sorted(param for param in parts.query.split('&') if param))
+        return urlunsplit((scheme, netloc, path, query, ''))
+
+    def unique_urls(self, urls: Iterable[str]) -> List[str]:
+        """Drop URLs whose canonical form was already seen, keeping the first spelling."""
+        unique = {}
+        for url in urls:
+            unique.setdefault(self.canonicalize(url), url)
+        return list(unique.values())
 
     def is_relevant_url(self, url: str, language: str) -> bool:
-        """Check if URL is relevant based on domain, path, and language."""
-        parsed_url = urlparse(url)
-        if parsed_url.netloc != self.domain:
-            return False
-        
-        is_relevant = False
-        for base_path in self.base_paths:
-          if parsed_url.path.startswith(base_path):
-            is_relevant = True
-            break
-        
-        if not is_relevant:
-          return False
-        
-        query_params = parse_qs(parsed_url.query)
-        url_language = query_params.get('hl', [None])[0]
-
-        if language == 'en':
-            return url_language is None
-        
-        return url_language == language
+        """Check if URL is relevant based on domain, path, language and URL patterns."""
+        return bool(self.filter_relevant((url,), language))
+
+    def filter_relevant(self, urls: Iterable[str], language: str) -> List[str]:
+        """Return the relevant URLs from a batch, in order."""
+        match = self.url_pattern.match
+        url_language = self.url_language
+        wanted = None if language == 'en' else language
+        include, exclude = self.include_patterns, self.exclude_patterns
+        relevant = []
+        for url in urls:
+            matched = match(url)
+            if matched is None:
+                continue
+            query = matched.group(1)
+            if (url_language(query) if query else None) != wanted:
+                continue
+            if include and not any(pattern.search(url) for pattern in include):
+                continue
+            if exclude and any(pattern.search(url) for pattern in exclude):
+                continue
+            relevant.append(url)
+        return relevant
 
     def find_sitemap_url(self, base_url: str) -> Optional[str]:
-        """Try to find sitemap URL from robots.txt or common locations."""
+        """Try to find sitemap URL from robots.txt or common locations.
+
+        Only successful responses count, so a site answering 404 everywhere
+        has no sitemap rather than a sitemap at the first common path.
+        """
+        robots_url = urljoin(base_url, '/robots.txt')
         try:
-            robots_url = urljoin(base_url, '/robots.txt')
             logger.info(f"Checking robots.txt at {robots_url}")
-            response = requests.get(robots_url, headers=self.headers, timeout=self.timeout)
-            
-            sitemap_match = re.search(r'Sitemap: (.*)', response.text)
-            if sitemap_match:
-                return sitemap_match.group(1)
-
-            # Try common sitemap locations
-            common_paths = ['/sitemap.xml', '/sitemap_index.xml', '/sitemap/sitemap.xml']
-            for path in common_paths:
-                url = urljoin(base_url, path)
-                try:
-                    requests.get(url, headers=self.headers, timeout=self.timeout)
-                    return url
-                except requests.RequestException:
-                    continue
-                    
+            response = self.transport.get(robots_url)
+            if response.ok:
+                sitemap_match = re.search(r'^\s*Sitemap:\s*(\S+)', response.text, re.IGNORECASE | re.MULTILINE)
+                if sitemap_match:
+                    return sitemap_match.group(1)
         except requests.RequestException as e:
             logger.error(f"Error finding sitemap: {e}")
+
+        # Try common sitemap locations
+        common_paths = ['/sitemap.xml', '/sitemap_index.xml', '/sitemap/sitemap.xml']
+        for path in common_paths:
+            url = urljoin(base_url, path)
+            try:
+                response = self.transport.get(url)
+            except requests.RequestException:
+                continue
+            if response.ok:
+                return url
         return None
 
-    def parse_sitemap(self, sitemap_url: str) -> List[str]:
-        """Parse XML sitemap and return list of URLs."""
+    def claim_sitemap(self, sitemap_url: str) -> bool:
+        """Mark a sitemap as visited, returning False if it was already seen."""
+        with self.seen_lock:
+            if sitemap_url in self.seen_sitemaps:
+                return False
+            self.seen_sitemaps.add(sitemap_url)
+            return True
+
+    def stream_sitemap(self, sitemap_url: str,
+                       fetch: Optional[Callable[[str], requests.Response]] = None) -> Iterator[SitemapEntry]:
+        """Yield the entries of a single sitemap document as it downloads."""
+        fetch = fetch or (lambda url: self.transport.get(url, stream=True))
+        response = fetch(sitemap_url)
+        parser = SitemapStreamParser()
+        decoded = 0
         try:
-            response = requests.get(sitemap_url, headers=self.headers, timeout=self.timeout)
-            root = ET.fromstring(response.content)
-            namespaces = {'ns': 'http://www.sitemaps.org/schemas/sitemap/0.9'}
-            
-            return [loc.text for loc in root.findall('.//ns:loc', namespaces)]
-            
-        except Exception as e:
-            logger.error(f"Error parsing sitemap {sitemap_url}: {e}")
-            return []
\ No newline at end of file
+            # An HTML error page would otherwise surface as an XML parse error
+            response.raise_for_status()
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                decoded += len(chunk)
+                yield from parser.feed(chunk)
+            yield from parser.close()
+        finally:
+            self.transport.record_response_bytes(response, decoded)
+            response.close()
+
+    def iter_sitemap(self, sitemap_url: str,
+                     fetch: Optional[Callable[[str], requests.Response]] = None) -> Iterator[SitemapEntry]:
+        """Yield page entries from a sitemap, recursively following indexes.
+
+        Each nested sitemap is visited at most once per URLProcessor, after
+        its parent has been read, so only one sitemap download is open at a time.
+        """
+        nested = []
+        for entry in self.stream_sitemap(sitemap_url, fetch):
+            if entry.is_sitemap:
+                nested.append(entry.loc)
+            else:
+                yield entry
+
+        for nested_url in nested:
+            if not self.claim_sitemap(nested_url):
+                continue
+            try:
+                yield from self.iter_sitemap(nested_url, fetch)
+            except Exception as e:
+                logger.error(f"Error parsing sitemap {nested_url}: {e}")
\ No newline at end of file